@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+"""Benchmarks
+
+Measures validator throughput, the prompt loop, menu rendering, directory
+lookups, and the time to ``import clux``, using synthetic data.
+
+Each result is written as one line of JSON so runs can be compared::
+
+    python3 benchmarks.py --output before.jsonl
+    python3 benchmarks.py --output after.jsonl --only ckitem
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import clux
+
+
+def measure(function, repeat=5):
+    """The best time, in seconds, for one call of the function."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def scripted(prompt, answers, **options):
+    """Run a full prompt, with an in-memory script of answers."""
+    return prompt(io=clux.Script(answers), **options)
+
+
+class MenuIndex(clux.PrefixIndex):
+    """A PrefixIndex which doesn't build its trigram index in the
+    background, where it would compete with the benchmarks."""
+    BACKGROUND = float('inf')
+
+
+class Fixtures:
+    """Synthetic data sets, scaled by size."""
+    def __init__(self, size, directory):
+        rng = random.Random(42)
+        self.size = size
+        self.menu = ["item{:07d}".format(n) for n in range(size)]
+        rng.shuffle(self.menu)
+        self.menu_index = MenuIndex(self.menu)
+        self.integers = [str(rng.randint(-10**6, 10**6)) for _ in range(size)]
+        start = datetime.date(1970, 1, 1)
+        days = [start + datetime.timedelta(days=rng.randint(0, 36500)) for _ in range(size)]
+        self.dates = [d.strftime("%m/%d/%y") for d in days]
+        self.iso_dates = [d.strftime("%Y-%m-%d") for d in days]
+        self.times = ["{:02d}:{:02d}:{:02d}".format(
+            rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)) for _ in range(size)]
+        self.yorn = [rng.choice(["y", "n", "yes", "no", "Y", "NO", "maybe"]) for _ in range(size)]
+        self.users = ["user{:07d}".format(n) for n in range(size)]
+        self.passwd = Path(directory) / "passwd"
+        self.passwd.write_text("".join(
+            "{0}:x:{1}:{1}:{0}:/home/{0}:/bin/sh\n".format(u, n) for n, u in enumerate(self.users)))
+        self.group = Path(directory) / "group"
+        self.group.write_text("".join(
+            "group{0:07d}:*:{0}:{1}\n".format(n, self.users[n]) for n in range(size)))
+
+
+def validator_benchmarks(f):
+    """Per-class validate() throughput."""
+    class BenchUID(clux.CKUID):
+        DIRECTORY = clux.Directory(str(f.passwd))
+
+    class BenchGID(clux.CKGID):
+        DIRECTORY = clux.Directory(str(f.group))
+
+    prefixes = [item[:-1] for item in f.menu[:1000]]
+    numbers = [str(n) for n in range(1, 1001)]
+    cases = [
+        ("ckint.validate", clux.ckint, {}, f.integers),
+        ("ckrange.validate", clux.ckrange, {"lower": 0, "upper": 10**6}, f.integers),
+        ("ckrange.validate.prefixes", clux.ckrange,
+            {"lower": 0, "upper": 10**6, "prefixes": True, "suffixes": True}, f.integers),
+        ("ckdate.validate", clux.ckdate, {}, f.dates),
+        ("ckdate.validate.formats", clux.ckdate, {"format": ["%Y-%m-%d", "%m/%d/%y"]}, f.dates),
+        ("cktime.validate", clux.cktime, {}, f.times),
+        ("ckyorn.validate", clux.ckyorn, {}, f.yorn),
+        ("ckstr.validate", clux.ckstr, {"regexp": r"item\d+"}, f.menu),
+        ("ckitem.validate.number", clux.ckitem, {"choices": f.menu_index}, numbers),
+        ("ckitem.validate.prefix", clux.ckitem, {"choices": f.menu_index}, prefixes),
+        ("ckkeywd.validate", clux.ckkeywd, {"keywords": f.menu_index}, prefixes),
+        ("ckuid.validate", BenchUID(), {}, f.users[:1000]),
+        ("ckgid.validate", BenchGID(), {}, ["group{:07d}".format(n) for n in range(1000)]),
+        ("ckpath.validate", clux.ckpath, {}, ["/tmp/" + u for u in f.users[:1000]]),
+    ]
+    for name, prompt, options, values in cases:
+        configured = prompt.configure(**options)
+
+        def run():
+            for text in values:
+                try:
+                    configured.validate(text)
+                except clux.Invalid:
+                    pass
+        yield name, len(values), lambda: measure(run)
+
+
+def column_benchmarks(f):
+    """Columnar validation of whole lists."""
+    cases = [
+        ("ckint.column", clux.ckint, {}, f.integers),
+        ("ckrange.column", clux.ckrange, {"lower": 0, "upper": 10**6}, f.integers),
+        ("ckrange.column.prefixes", clux.ckrange,
+            {"lower": 0, "upper": 10**6, "prefixes": True, "suffixes": True}, f.integers),
+        ("ckdate.column", clux.ckdate, {}, f.dates),
+        ("cktime.column", clux.cktime, {}, f.times),
+        ("ckyorn.column", clux.ckyorn, {}, f.yorn),
+    ]
+    for name, prompt, options, values in cases:
+        configured = prompt.configure(**options)
+        yield name, len(values), lambda: measure(lambda: configured.column(values))
+
+
+def prompt_benchmarks(f):
+    """The full prompt loop, with a scripted answer for each prompt."""
+    count = min(f.size, 10000)
+    cases = [
+        ("dialog.ckint", clux.ckint, {}, ["bad", "?", "42"]),
+        ("dialog.ckdate", clux.ckdate, {}, ["13/45/99", "9/10/11"]),
+        ("dialog.ckyorn", clux.ckyorn, {}, ["y"]),
+        ("dialog.ckitem", clux.ckitem, {"choices": f.menu_index, "page_size": 20}, [">", "??", "5"]),
+    ]
+    for name, prompt, options, answers in cases:
+        def run():
+            for _ in range(count):
+                scripted(prompt, answers, **options)
+        yield name, count, lambda: measure(run, repeat=3)
+
+
+def menu_benchmarks(f):
+    """Menu rendering: one page, and the whole menu."""
+    paged = clux.ckitem.configure(choices=f.menu_index, page_size=40, columns=4)
+    whole = clux.ckitem.configure(choices=f.menu_index)
+    yield "render_menu.page", 1, lambda: measure(paged.render_menu)
+    yield "render_menu.whole", f.size, lambda: measure(whole.render_menu, repeat=3)
+    yield "PrefixIndex.build", f.size, lambda: measure(lambda: MenuIndex(f.menu), repeat=3)
+
+    def keystrokes():
+        chooser = clux.LiveFilter(whole)
+        for key in "item00012\x7f\x7f345":
+            chooser.key(key)
+            chooser.render("Item")
+    yield "LiveFilter.key", 12, lambda: measure(keystrokes)
+
+
+def directory_benchmarks(f):
+    """User and group directories: a cold load and a cached lookup."""
+    directory = clux.Directory(str(f.passwd))
+
+    def cold():
+        directory.invalidate()
+        directory.get()
+    yield "Directory.load", f.size, lambda: measure(cold, repeat=3)
+    count = 1000
+    yield "Directory.cached", count, lambda: measure(lambda: [directory.get() for _ in range(count)])
+
+    index = str(f.passwd) + ".idx"
+
+    def mapped():
+        names = clux.Directory(str(f.passwd), index=index).get()
+        return f.users[-1] in names
+
+    def warm_mapped():
+        mapped()
+        return measure(mapped)
+    yield "Directory.mapped", 1, warm_mapped
+
+
+def import_benchmarks(f):
+    """The time for a fresh interpreter to ``import clux``."""
+    def cumulative():
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import clux"],
+            cwd=str(Path(__file__).parent), capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = [field.strip() for field in line.partition(":")[2].split("|")]
+            if len(fields) == 3 and fields[2] == "clux":
+                return int(fields[1]) / 1e6
+    yield "import.clux", 1, lambda: min(cumulative() for _ in range(5))
+
+
+# Each suite yields (name, count, run) for its benchmarks, where run()
+# measures the benchmark and returns the seconds, so that only the
+# benchmarks selected with --only are measured.
+SUITES = [
+    validator_benchmarks, column_benchmarks, prompt_benchmarks, menu_benchmarks,
+    directory_benchmarks, import_benchmarks,
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000,
+        help="items in the synthetic menus, directories and date lists")
+    parser.add_argument("--only", default=None,
+        help="regular expression to select benchmarks by name")
+    parser.add_argument("--output", default=None,
+        help="file for JSON lines results; default is stdout")
+    options = parser.parse_args(argv)
+    selected = re.compile(options.only) if options.only else None
+
+    output = open(options.output, "w") if options.output else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            fixtures = Fixtures(options.size, directory)
+            for suite in SUITES:
+                for name, count, run in suite(fixtures):
+                    if selected and not selected.search(name):
+                        continue
+                    seconds = run()
+                    result = {
+                        "name": name,
+                        "count": count,
+                        "seconds": seconds,
+                        "per_second": count / seconds if seconds else None,
+                        "size": options.size,
+                        "python": platform.python_version(),
+                    }
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
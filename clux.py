@@ -22,30 +22,280 @@ TODO: Several other features
     -   The NoQuit option
     
     -   A '~' in help, error, or prompt prompt includes the default text
-    
-    -   Multiple bases for ckint()
 """
-import datetime
+import bisect
+import contextlib
+import copy
+import functools
+import itertools
 import os
-import pathlib
 import re
-from collections import namedtuple
+import stat
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict, namedtuple
 from enum import Enum
 
+
+class LazyModule:
+    """A module that's imported when it's first used.
+
+    The command-line prompts start in a tight loop, so modules which
+    only some prompts need (like datetime and pathlib) aren't imported
+    until then. On first use the module replaces this placeholder.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        module = __import__(self.name)
+        if globals().get(self.name) is self:
+            globals()[self.name] = module
+        return getattr(module, attr)
+
+
+datetime = LazyModule('datetime')
+pathlib = LazyModule('pathlib')
+
+
 class UserQuit(Exception):
     """The user entered q to quit."""
     pass
 
 
+class EndOfInput(UserQuit):
+    """The input ended (End-of-File) before there was an answer."""
+    pass
+
+
+class Timeout(UserQuit):
+    """There was no answer before the deadline, and no default."""
+    pass
+
+
 class Invalid(Exception):
     """The user input was invalid."""
     pass
 
 
+Column = namedtuple('Column', ['values', 'invalid'])
+Response = namedtuple('Response', ['line', 'text', 'value', 'error'])
+
+
+class Summary:
+    """A collection in a template, formatted as a comma-separated list.
+
+    Only the first ``limit`` items are formatted; the rest are
+    summarized. The formatting is done lazily, when a template
+    actually uses the collection.
+    """
+    def __init__(self, items, limit=None):
+        self.items = items
+        self.limit = limit
+
+    def __format__(self, spec):
+        items = getattr(self.items, 'order', self.items)
+        if self.limit is None or len(items) <= self.limit:
+            return ','.join(map(str, items))
+        head = ','.join(map(str, itertools.islice(items, self.limit)))
+        return "{},... (first {} of {:,}, type ?? for more)".format(
+            head, self.limit, len(items))
+
+
+class PromptMetrics:
+    """What happened during one prompt.
+
+    When a ``METRICS`` sink is set, one of these is collected for
+    each prompt and given to the sink when the prompt is finished.
+    The outcome is 'answer', 'default', 'quit', 'eof', 'timeout'
+    or 'abandoned'. The time spent waiting for input is ``wait_seconds``.
+    """
+    def __init__(self, ck, prompt):
+        self.name = type(ck).__name__
+        self.prompt = prompt
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.validate_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.invalid = 0
+        self.help = 0
+        self.outcome = None
+        self.errors = []
+
+    def validate(self, validator, text):
+        """Time a validator, counting invalid input and keeping the cause."""
+        start = time.perf_counter()
+        try:
+            response = validator(text)
+            self.outcome = 'answer'
+            return response
+        except Invalid as ex:
+            self.invalid += 1
+            self.errors.append(repr(ex.__cause__ if ex.__cause__ is not None else ex))
+            raise
+        finally:
+            self.validate_seconds += time.perf_counter() - start
+
+    def finish(self, sink):
+        """Stop the clock and hand the metrics to the sink."""
+        self.seconds = time.perf_counter() - self.start
+        if self.outcome is None:
+            self.outcome = 'abandoned'
+        sink(self)
+
+    def asdict(self):
+        return {name: value for name, value in vars(self).items() if name != 'start'}
+
+
+class Aggregator:
+    """A metrics sink which keeps totals in memory for each prompt class."""
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, metrics):
+        with self.lock:
+            totals = self.totals.setdefault(metrics.name, Counter())
+            totals['prompts'] += 1
+            totals['seconds'] += metrics.seconds
+            totals['validate_seconds'] += metrics.validate_seconds
+            totals['wait_seconds'] += metrics.wait_seconds
+            totals['invalid'] += metrics.invalid
+            totals['help'] += metrics.help
+            totals[metrics.outcome] += 1
+
+
+class JSONLines:
+    """A metrics sink which appends one line of JSON per prompt to a file."""
+    def __init__(self, file):
+        self.file = file
+        self.lock = threading.Lock()
+
+    def __call__(self, metrics):
+        import json
+        line = json.dumps(metrics.asdict()) + "\n"
+        with self.lock:
+            if isinstance(self.file, (str, os.PathLike)):
+                with open(self.file, "a") as target:
+                    target.write(line)
+            else:
+                self.file.write(line)
+                self.file.flush()
+
+
+class AnswerStore:
+    """Answers remembered between runs, for installers which are re-run.
+
+    Each valid answer is appended to a log file as a line of JSON, with
+    a key made from the prompt's ``id``, its class and its options. The
+    log is read into an in-memory index once; the last answer for a key
+    wins. Answers are validated again before they're used.
+
+    With ``skip``, prompts with a valid previous answer aren't asked again,
+    for non-interactive re-runs. Otherwise, the previous answer is the
+    default.
+    """
+    def __init__(self, path, skip=False):
+        import json
+        self.path = path
+        self.skip = skip
+        self.index = {}
+        self.lock = threading.Lock()
+        try:
+            with open(path) as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                        self.index[record['key']] = record['text']
+                    except (ValueError, KeyError, TypeError):
+                        pass  # e.g., a line cut short by a crash
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def key(id, ck, options):
+        """A stable key for a prompt. Large collections, like menus,
+        contribute only their type and size; validation will catch changes.
+        """
+        import hashlib
+        import json
+
+        def stable(value):
+            if isinstance(value, (str, int, float, bool, type(None))):
+                return value
+            elif isinstance(value, (list, tuple)) and len(value) <= 100:
+                return [stable(v) for v in value]
+            elif hasattr(value, '__len__'):
+                return "{}[{}]".format(type(value).__name__, len(value))
+            return type(value).__name__
+        fields = [type(ck).__name__, {name: stable(value) for name, value in sorted(options.items())}]
+        digest = hashlib.sha1(json.dumps(fields).encode()).hexdigest()[:16]
+        return "{}:{}".format(id, digest)
+
+    def recall(self, key, ck):
+        """The validated previous answer, or None."""
+        text = self.index.get(key)
+        if text is None:
+            return None
+        try:
+            return ck.validate(text)
+        except Invalid:
+            return None
+
+    def save(self, key, ck, value, text):
+        """Append the answer to the log, unless it's unchanged.
+        The value is saved as text if it validates to itself, so a menu
+        item is kept rather than its number; otherwise the text typed is.
+        A default accepted without typing (text None) is only saved if
+        it validates to itself.
+        """
+        import json
+        try:
+            if ck.validate(str(value)) == value:
+                text = str(value)
+        except Invalid:
+            pass
+        if text is None:
+            return
+        with self.lock:
+            if self.index.get(key) == text:
+                return
+            with open(self.path, "a") as log:
+                log.write(json.dumps({'key': key, 'text': text}) + "\n")
+            self.index[key] = text
+
+    def compact(self):
+        """Rewrite the log with only the latest answer for each key."""
+        import json
+        with self.lock:
+            temporary = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(temporary, "w") as log:
+                log.writelines(
+                    json.dumps({'key': key, 'text': text}) + "\n" for key, text in self.index.items())
+            os.replace(temporary, self.path)
+
+
 class CKUI:
     """Superclass for all of the CKUI classes.
+
+    Set ``METRICS`` to a sink to collect PromptMetrics. A sink is any
+    callable, like an Aggregator, a JSONLines file, or a function.
+    Set ``ANSWERS`` to an AnswerStore to remember answers between runs.
+
+    The module-level prompts are never changed by a call. Options are
+    set up on a copy, the spec, which is frozen: its attributes can't
+    be assigned. A spec can be reused, and shared between threads.
     """
-    DEBUG = False
+    METRICS = None
+    ANSWERS = None
+    frozen = False
+
+    # Seconds to wait for an answer to each prompt, and a time.monotonic()
+    # deadline for all prompts. Either one can be None, to wait forever.
+    TIMEOUT = None
+    DEADLINE = None
     
     PROMPT = "Enter an appropriate value"
     HELP = """Please enter a string which contains no embedded,
@@ -57,53 +307,717 @@ leading or trailing spaces or tabs.
     
     HINT = '?,q'
     
-    def help(self):
-        """Inject values into the help template."""
-        return self.HELP.format_map(vars(self))
+    LIMIT = 20
+    MORE = False
+
+    def render(self, template, limit=None):
+        """Inject values into a template.
+
+        Lists of values are summarized to ``limit`` items.
+        The result is cached until the next ``setup()``.
+        """
+        rendered = vars(self).setdefault('rendered', {})
+        key = (template, limit)
+        if key not in rendered:
+            fields = {
+                name: Summary(value, limit)
+                if isinstance(value, (list, tuple, frozenset, MappedNames)) else value
+                for name, value in vars(self).items()
+            }
+            rendered[key] = template.format_map(fields)
+        return rendered[key]
+
+    def help(self, full=False):
+        """Inject values into the help template.
+        Long lists are summarized unless the full help is requested.
+        """
+        return self.render(self.HELP, None if full else self.LIMIT)
         
     def error(self):
         """Inject values into the error template."""
-        return self.ERROR.format_map(vars(self))
+        return self.render(self.ERROR, self.LIMIT)
         
     def hint(self):
         """Inject values into the hint template."""
-        return self.HINT.format_map(vars(self))
+        return self.render(self.HINT, self.LIMIT)
     
     def validate(self, text):
         """Validate input, returns canonical form or raises Invalid"""
         return text
+
+    def column(self, texts):
+        """Validate a column of texts, like a list or a NumPy array of strings.
+
+        Returns a Column with the canonical values, None for invalid texts,
+        and a mask which is True for the invalid rows. A NumPy array gets
+        NumPy arrays back.
+        """
+        numpy = sys.modules.get('numpy')
+        array = numpy is not None and isinstance(texts, numpy.ndarray)
+        texts = texts.tolist() if array else list(texts)
+        values = self.validate_column(texts)
+        invalid = [value is None for value in values]
+        if array:
+            return Column(numpy.array(values, dtype=object), numpy.array(invalid, dtype=bool))
+        return Column(values, invalid)
+
+    def validate_column(self, texts):
+        """The values for a list of texts, None where a text is invalid.
+        By default, each distinct text is validated once.
+        """
+        results = {}
+        for text in set(texts):
+            try:
+                results[text] = self.validate(text)
+            except Invalid:
+                results[text] = None
+        return list(map(results.__getitem__, texts))
+
+    def __setattr__(self, name, value):
+        if vars(self).get('frozen'):
+            raise AttributeError("{} spec is frozen; use configure()".format(
+                self.__class__.__name__))
+        super().__setattr__(name, value)
+
+    def setup(self):
+        """Save the options for a prompt. Subclasses add keyword options.
+        This also discards any cached templates.
+        """
+        self.rendered = {}
+
+    def configure(self, **options):
+        """A frozen copy of this prompt, set up with the given options."""
+        configured = copy.copy(self)
+        vars(configured).pop('frozen', None)
+        configured.setup(**options)
+        configured.frozen = True
+        return configured
+
+    def spec(self, **options):
+        """This prompt if it is already a spec and there are no options,
+        otherwise a new spec.
+        """
+        if self.frozen and not options:
+            return self
+        return self.configure(**options)
+
+    def stream(self, answers, *, default=None, **options):
+        """Validate answers without prompting.
+
+        The answers can be any iterable of strings, like an open
+        response file. Trailing newlines are ignored.
+
+        Lazily yields a Response for each answer, with either the
+        canonical value or the error message.
+        """
+        configured = self.spec(**options)
+        for line, text in enumerate(answers, 1):
+            text = text.rstrip('\r\n')
+            if text == '' and default is not None:
+                response = Response(line, text, default, None)
+            else:
+                try:
+                    response = Response(line, text, configured.validate(text), None)
+                except Invalid as ex:
+                    response = Response(line, text, None, configured.explain(text, ex))
+            yield response
         
-    def __call__(self, *, prompt=None, default=None, help=None, error=None):
-        """Core interaction loop.
-        
-        Prompt for input.
+    def deadline(self, timeout=None):
+        """The time.monotonic() deadline for a prompt, or None.
+        The timeout defaults to ``TIMEOUT``.
+        """
+        timeout = timeout if timeout is not None else self.TIMEOUT
+        deadlines = [self.DEADLINE, None if timeout is None else time.monotonic() + timeout]
+        return min((d for d in deadlines if d is not None), default=None)
+
+    def intro(self, state):
+        """Text to show before the first prompt, or None.
+        The state is a dictionary for this one dialog.
+        """
+        return None
+
+    def command(self, text, state):
+        """Respond to a command other than "?" and "q".
+        Returns the text to show, or None if text isn't a command.
+        """
+        if text in ['??'] and self.MORE:
+            return self.help(full=True)
+        return None
+
+    def dialog(self, *, prompt=None, default=None, help=None, error=None, state=None):
+        """Core interaction loop, as a generator.
+
+        Yields ("print", text) to show text and ("input", prompt) to
+        read a line. The line read is sent back in; None means End-of-File.
+        A Timeout thrown in returns the default, if there is one.
         Repond to "?", "q", End-of-File, and other inputs.
-        
-        Returns canonical string answer.
+        The text of a valid answer is saved as 'answer' in the state.
+
+        Returns canonical answer.
         Raises UserQuit when the user quits.
         """
         if prompt is None:
             prompt = self.PROMPT
-        if error is None:
-            error = self.ERROR
-        response = None
-        while not response:
+        metrics = PromptMetrics(self, prompt) if self.METRICS is not None else None
+        try:
+            state = {} if state is None else state
+            intro = self.intro(state)
+            if intro is not None:
+                yield "print", intro
+            while True:
+                waiting = time.perf_counter() if metrics is not None else None
+                try:
+                    a = yield "input", "{} [{}]: ".format(prompt, self.hint())
+                except Timeout:
+                    if metrics is not None:
+                        metrics.outcome = 'timeout'
+                    if default is None:
+                        raise
+                    return default
+                finally:
+                    if metrics is not None:
+                        metrics.wait_seconds += time.perf_counter() - waiting
+                if a is None or a.lower() in ['q', 'quit']:
+                    if metrics is not None:
+                        metrics.outcome = 'eof' if a is None else 'quit'
+                    raise EndOfInput if a is None else UserQuit
+                elif a in ['?']:
+                    if metrics is not None:
+                        metrics.help += 1
+                    yield "print", help if help is not None else self.help()
+                    continue
+                text = self.command(a, state)
+                if text is not None:
+                    yield "print", text
+                elif a == '' and default is not None:
+                    if metrics is not None:
+                        metrics.outcome = 'default'
+                    state['default'] = True
+                    return default
+                else:
+                    try:
+                        if metrics is None:
+                            value = self.validate(a)
+                        else:
+                            value = metrics.validate(self.validate, a)
+                        state['answer'] = a
+                        return value
+                    except Invalid as ex:
+                        yield "print", error if error is not None else self.explain(a, ex)
+        finally:
+            if metrics is not None:
+                metrics.finish(self.METRICS)
+
+    def explain(self, text, ex):
+        """The error message for invalid text. By default, the error template."""
+        return self.error()
+
+    def candidates(self, text):
+        """Completions for the text, generated lazily. There are none by default."""
+        return iter(())
+
+    def __call__(self, *, prompt=None, default=None, help=None, error=None,
+        io=None, timeout=None, id=None, **options):
+        """Prompt for input using an I/O backend.
+        By default, this is a Terminal, with ``print()`` and ``input()``.
+        After ``timeout`` seconds, the answer is the default.
+
+        With an ``id`` and an ``ANSWERS`` store, a previous answer to
+        the same prompt, if it's still valid, becomes the default.
+        
+        Returns canonical answer.
+        Raises UserQuit when the user quits, and Timeout if there's
+        no answer in time and no default.
+        """
+        configured = self.spec(**options)
+        store = configured.ANSWERS if id is not None else None
+        if store is not None:
+            key = store.key(id, configured, options)
+            previous = store.recall(key, configured)
+            if previous is not None and store.skip:
+                return previous
+            default = previous if previous is not None else default
+        state = {}
+        dialog = configured.dialog(prompt=prompt, default=default, help=help, error=error, state=state)
+        deadline = configured.deadline(timeout)
+        if io is None:
+            with completion(configured):
+                answer = converse(dialog, Terminal(), deadline)
+        else:
+            answer = converse(dialog, io, deadline)
+        if store is not None and 'answer' in state:
+            store.save(key, configured, answer, state['answer'])
+        elif store is not None and 'default' in state and previous is None:
+            store.save(key, configured, answer, None)
+        return answer
+
+    async def ask_async(self, *, reader=None, writer=None,
+        prompt=None, default=None, help=None, error=None, timeout=None, **options):
+        """Prompt for input without blocking the event loop.
+
+        Lines are read from an ``asyncio.StreamReader``, by default
+        one connected to stdin. Output goes to an ``asyncio.StreamWriter``,
+        by default stdout. Many prompts can wait concurrently.
+
+        Returns canonical answer.
+        Raises UserQuit when the user quits.
+        """
+        configured = self.spec(**options)
+        if reader is None:
+            reader = await stdin_reader()
+        return await converse_async(
+            configured.dialog(prompt=prompt, default=default, help=help, error=error),
+            reader, writer, configured.deadline(timeout))
+
+
+class Terminal:
+    """The default I/O, with ``print()`` and ``input()``.
+
+    Lines written are held until the next read, the flush point,
+    then printed at once.
+    """
+    def __init__(self):
+        self.pending = []
+
+    def write(self, text):
+        self.pending.append(text)
+
+    def flush(self):
+        if self.pending:
+            print("\n".join(self.pending))
+            self.pending = []
+
+    def read(self, prompt, timeout=None):
+        """Show the prompt and read a line. None means End-of-File.
+        With a timeout, stdin is read with ``read_line()``; Timeout is
+        raised when there's no line in time.
+        """
+        self.flush()
+        if timeout is not None or sys.stdin in line_readers:
+            sys.stdout.write(prompt)
+            sys.stdout.flush()
+            return read_line(sys.stdin, timeout)
+        try:
+            return input(prompt)
+        except EOFError:
+            return None
+
+
+class TextStreams:
+    """I/O with text files, e.g., a pipe, a socket file or /dev/tty.
+
+    Output, including the prompt, is written to the target with one
+    write and one flush before each line is read from the source.
+    """
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.pending = []
+
+    def write(self, text):
+        self.pending.append(text + "\n")
+
+    def flush(self):
+        if self.pending:
+            self.target.write("".join(self.pending))
+            self.target.flush()
+            self.pending = []
+
+    def read(self, prompt, timeout=None):
+        self.pending.append(prompt)
+        self.flush()
+        if timeout is not None or self.source in line_readers:
+            return read_line(self.source, timeout)
+        line = self.source.readline()
+        return line.rstrip("\r\n") if line else None
+
+
+class Script:
+    """In-memory I/O for tests and load tests.
+
+    The lines read are the given answers, then End-of-File. An answer
+    which is an exception, like Timeout, is raised instead.
+    Everything written, including the prompts, is kept in ``transcript``.
+    """
+    def __init__(self, answers=()):
+        self.answers = iter(answers)
+        self.transcript = []
+
+    def write(self, text):
+        self.transcript.append(text + "\n")
+
+    def flush(self):
+        pass
+
+    def read(self, prompt, timeout=None):
+        self.transcript.append(prompt)
+        answer = next(self.answers, None)
+        if isinstance(answer, BaseException) or (
+                isinstance(answer, type) and issubclass(answer, BaseException)):
+            raise answer
+        return answer
+
+
+# The files with a readline() still waiting in a thread, after a Timeout.
+line_readers = {}
+
+
+def read_line(file, timeout=None):
+    """Read a line with ``file.readline()``, waiting at most ``timeout``
+    seconds for it. None means End-of-File. Raises Timeout.
+
+    The line is read through the file's own buffer, in a thread, so
+    terminals, pipes, regular files and /dev/null all work, and no line
+    already buffered is skipped. After a Timeout, the thread keeps
+    waiting, and its line is the one returned by the next read.
+    """
+    import queue
+    pending = line_readers.get(file)
+    if pending is None:
+        try:
+            regular = stat.S_ISREG(os.fstat(file.fileno()).st_mode)
+        except (AttributeError, OSError, ValueError):
+            regular = False
+        if regular:
+            line = file.readline()
+            return line.rstrip("\r\n") if line else None
+        pending = queue.Queue(1)
+
+        def reader():
             try:
-                a=input("{} [{}]: ".format(prompt, self.hint()))
-            except EOFError:
-                raise UserQuit
-            if a.lower() in ['q', 'quit']:
-                raise UserQuit
-            elif a in ['?']:
-                print(help if help is not None else self.help())
-            elif a == '' and default is not None:
-                response = default
+                pending.put(file.readline())
+            except (OSError, ValueError):
+                pending.put("")
+        threading.Thread(target=reader, daemon=True).start()
+        line_readers[file] = pending
+    try:
+        line = pending.get(timeout=timeout)
+    except queue.Empty:
+        raise Timeout
+    del line_readers[file]
+    return line.rstrip("\r\n") if line else None
+
+
+def converse(dialog, io=None, deadline=None):
+    """Run a dialog with an I/O backend, by default a Terminal.
+    A backend has ``write(text)`` for a line of output, ``read(prompt)``
+    for a line of input, and ``flush()``. With a time.monotonic()
+    deadline, ``read(prompt, timeout)`` raises Timeout when time is up.
+    """
+    io = io if io is not None else Terminal()
+    line = None
+    expired = None
+    try:
+        while True:
+            action, text = dialog.send(line) if expired is None else dialog.throw(expired)
+            line = expired = None
+            if action == "print":
+                io.write(text)
+            elif deadline is None:
+                line = io.read(text)
+            else:
+                try:
+                    line = io.read(text, max(0.0, deadline - time.monotonic()))
+                except Timeout as ex:
+                    expired = ex
+    except StopIteration as done:
+        return done.value
+    finally:
+        io.flush()
+
+
+class Completer:
+    """A readline completer for a prompt.
+
+    On each TAB, at most ``limit`` candidates are collected, and the
+    collection stops after ``budget`` seconds, no matter how large the
+    source of candidates is.
+    """
+    def __init__(self, ck, limit=100, budget=0.05):
+        self.ck = ck
+        self.limit = limit
+        self.budget = budget
+        self.matches = []
+
+    def collect(self, text):
+        deadline = time.monotonic() + self.budget
+        matches = []
+        for candidate in self.ck.candidates(text):
+            matches.append(candidate)
+            if len(matches) >= self.limit or time.monotonic() > deadline:
+                break
+        return matches
+
+    def __call__(self, text, state):
+        if state == 0:
+            self.matches = self.collect(text)
+        return self.matches[state] if state < len(self.matches) else None
+
+
+@contextlib.contextmanager
+def completion(ck):
+    """Use the prompt's candidates for readline's TAB completion,
+    if readline is available and the input is a terminal.
+    """
+    if not sys.stdin.isatty():
+        yield
+        return
+    try:
+        import readline
+    except ImportError:
+        yield
+        return
+    completer, delims = readline.get_completer(), readline.get_completer_delims()
+    readline.set_completer(Completer(ck))
+    readline.set_completer_delims("")
+    readline.parse_and_bind("tab: complete")
+    try:
+        yield
+    finally:
+        readline.set_completer(completer)
+        readline.set_completer_delims(delims)
+
+
+async def converse_async(dialog, reader, writer=None, deadline=None):
+    """Run a dialog with an asyncio stream reader and writer.
+    Without a writer, output goes to stdout. With a time.monotonic()
+    deadline, the dialog gets a Timeout when time is up.
+    """
+    import asyncio
+    line = None
+    expired = None
+    try:
+        while True:
+            action, text = dialog.send(line) if expired is None else dialog.throw(expired)
+            line = expired = None
+            if action == "print":
+                text += "\n"
+            if writer is None:
+                sys.stdout.write(text)
+                sys.stdout.flush()
             else:
+                writer.write(text.encode())
+                await writer.drain()
+            if action == "input":
+                try:
+                    data = await asyncio.wait_for(reader.readline(),
+                        None if deadline is None else max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    expired = Timeout()
+                    continue
+                line = data.decode().rstrip("\r\n") if data else None
+    except StopIteration as done:
+        return done.value
+
+
+stdin_readers = weakref.WeakKeyDictionary()
+
+async def stdin_reader():
+    """The asyncio.StreamReader for stdin, one for each event loop."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    if loop not in stdin_readers:
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        stdin_readers[loop] = reader
+    return stdin_readers[loop]
+
+
+class DateTimeFormat:
+    """A compiled parser for one or more strptime-style formats.
+
+    The common numeric directives are translated into one regular
+    expression with an alternative for each format, so the matching
+    format is found in a single pass. Formats using any other directive
+    (locale names, %j, %p, etc.) fall back to ``strptime()``.
+
+    Use ``compile_formats()`` to share parsers among prompts.
+    Raises ValueError for a format which ``strptime()`` can't parse.
+    """
+    DIRECTIVES = {
+        'd': r"3[01]|[12]\d|0[1-9]|[1-9]| [1-9]",
+        'm': r"1[0-2]|0[1-9]|[1-9]",
+        'y': r"\d\d",
+        'Y': r"\d\d\d\d",
+        'H': r"2[0-3]|[0-1]\d|\d",
+        'M': r"[0-5]\d|\d",
+        'S': r"6[0-1]|[0-5]\d|\d",
+        'f': r"[0-9]{1,6}",
+    }
+
+    def __init__(self, formats):
+        self.formats = formats
+        translated = [self.translate(n, f) for n, f in enumerate(formats)]
+        for format, t in zip(formats, translated):
+            if t is None:
+                self.check(format)
+        if all(t is not None for t in translated):
+            self.directives = [directives for _, directives in translated]
+            self.groups = [
+                ["_{}{}".format(n, d) for d in directives] + ["_{}".format(n)]
+                for n, directives in enumerate(self.directives)]
+            alternatives = ["(?P<_{}>{})".format(n, regex) for n, (regex, _) in enumerate(translated)]
+            self.patterns = [re.compile(regex, re.IGNORECASE) for regex in alternatives]
+            self.pattern = re.compile("|".join(alternatives), re.IGNORECASE)
+        else:
+            self.pattern = None
+
+    @staticmethod
+    def check(format):
+        """Raise ValueError unless a date written with the format can be read back."""
+        sample = datetime.datetime(2001, 2, 3, 4, 5, 6).strftime(format)
+        try:
+            datetime.datetime.strptime(sample, format)
+        except (ValueError, re.error) as ex:
+            raise ValueError("Bad format {!r}: {}".format(format, ex)) from None
+
+    @classmethod
+    def translate(cls, n, format):
+        """The regular expression and directives for format number n.
+        None if the format needs strptime().
+        """
+        regex = []
+        directives = []
+        chars = iter(format)
+        for c in chars:
+            if c == '%':
+                d = next(chars, '')
+                if d == '%':
+                    regex.append('%')
+                elif d in cls.DIRECTIVES and d not in directives:
+                    directives.append(d)
+                    regex.append("(?P<_{}{}>{})".format(n, d, cls.DIRECTIVES[d]))
+                else:
+                    return None
+            elif c.isspace():
+                if not regex or regex[-1] != r'\s+':
+                    regex.append(r'\s+')
+            else:
+                regex.append(re.escape(c))
+        if 'y' in directives and 'Y' in directives:
+            return None
+        return ''.join(regex), directives
+
+    POSITION = {'Y': 0, 'y': 0, 'm': 1, 'd': 2, 'H': 3, 'M': 4, 'S': 5, 'f': 6}
+
+    def convert(self, n, match):
+        """Build the datetime from a match for format number n."""
+        args = [1900, 1, 1, 0, 0, 0, 0]
+        for d, value in zip(self.directives[n], match.group(*self.groups[n])):
+            if d == 'y':
+                year = int(value)
+                args[0] = year + (2000 if year <= 68 else 1900)
+            elif d == 'f':
+                args[6] = int(value.ljust(6, '0'))
+            else:
+                args[self.POSITION[d]] = int(value)
+        return datetime.datetime(*args)
+
+    def parse(self, text):
+        """The datetime for the first format that matches, or raise ValueError."""
+        if self.pattern is None:
+            for format in self.formats:
+                try:
+                    return datetime.datetime.strptime(text, format)
+                except ValueError:
+                    pass
+        else:
+            match = self.pattern.fullmatch(text)
+            if match:
+                first = int(match.lastgroup[1:])
+                try:
+                    return self.convert(first, match)
+                except ValueError:
+                    pass
+                for n in range(first+1, len(self.formats)):
+                    match = self.patterns[n].fullmatch(text)
+                    if match:
+                        try:
+                            return self.convert(n, match)
+                        except ValueError:
+                            pass
+        raise ValueError("{!r} does not match {}".format(text, " or ".join(self.formats)))
+
+
+@functools.lru_cache(maxsize=128)
+def compile_formats(formats):
+    """A shared DateTimeFormat for a tuple of formats."""
+    return DateTimeFormat(formats)
+
+
+class IntegerFormat:
+    """A compiled grammar for integers.
+
+    Digits are in the given ``base``, from 2 to 36, and may be separated
+    by single underscores. With ``prefixes``, 0b, 0o and 0x numbers are
+    binary, octal and hexadecimal whatever the base. With ``suffixes``,
+    a K, M or G multiplies by 2**10, 2**20 or 2**30.
+
+    Parsing returns None for invalid text rather than raising an exception.
+    Use ``compile_integers()`` to share grammars among prompts.
+    """
+    PREFIXES = {'0b': 2, '0o': 8, '0x': 16}
+    SUFFIXES = {'k': 2**10, 'm': 2**20, 'g': 2**30}
+
+    def __init__(self, base=10, prefixes=False, suffixes=False):
+        if not 2 <= base <= 36:
+            raise ValueError("base {} is not from 2 to 36".format(base))
+        if suffixes and base > 16:
+            raise ValueError("suffixes need a base of 16 or less, not {}".format(base))
+        self.base = base
+        self.bases = list(self.PREFIXES.values()) if prefixes else []
+        self.bases.append(base)
+        self.names = ["_{}".format(b) for b in self.bases[:-1]] + ["_n", "sign"]
+        if suffixes:
+            self.names.append("suffix")
+        alternatives = [
+            "{}_?(?P<_{}>{})".format(prefix, b, self.digits(b)) for prefix, b in self.PREFIXES.items()
+        ] if prefixes else []
+        alternatives.append("(?P<_n>{})".format(self.digits(base)))
+        self.pattern = re.compile(r"\s*(?P<sign>[-+]?)(?:{}){}\s*".format(
+            "|".join(alternatives), "(?P<suffix>[kmg])?" if suffixes else ""), re.IGNORECASE)
+        self.suffixes = suffixes
+
+    @staticmethod
+    def digits(base):
+        """The regular expression for digits in a base, with underscores."""
+        if base <= 10:
+            digit = "[0-{}]".format(base-1)
+        else:
+            digit = "[0-9a-{}]".format(chr(ord('a') + base - 11))
+        return "{0}(?:_?{0})*".format(digit)
+
+    def convert(self, match):
+        """The integer for a match, or None if it has too many digits."""
+        groups = match.group(*self.names)
+        for digits, base in zip(groups, self.bases):
+            if digits is not None:
                 try:
-                    response = self.validate(a)
-                except Invalid:
-                    print(self.error())
-        return response
+                    value = int(digits, base)
+                except ValueError:
+                    return None
+                break
+        if groups[len(self.bases)] == '-':
+            value = -value
+        if self.suffixes and groups[-1]:
+            value *= self.SUFFIXES[groups[-1].lower()]
+        return value
+
+    def parse(self, text):
+        """The integer for the text, or None."""
+        match = self.pattern.fullmatch(text)
+        return self.convert(match) if match else None
+
+    def parse_many(self, texts):
+        """The integers for a list of texts, with None for invalid texts."""
+        convert = self.convert
+        return [convert(m) if m else None for m in map(self.pattern.fullmatch, texts)]
+
+
+@functools.lru_cache(maxsize=128)
+def compile_integers(base=10, prefixes=False, suffixes=False):
+    """A shared IntegerFormat."""
+    return IntegerFormat(base, prefixes, suffixes)
 
 
 class CKDATE(CKUI):
@@ -115,38 +1029,458 @@ class CKDATE(CKUI):
     def validate(self, text):
         """Validate input, returns date."""
         try:
-            dt = datetime.datetime.strptime(text, self.format)
+            dt = self.parser.parse(text)
             return dt.date()
-        except Exception as ex:
-            if self.DEBUG: 
-                print(ex)
-            raise Invalid
+        except ValueError as ex:
+            raise Invalid from ex
         
-    def __call__(self, *, format="%m/%d/%y", **kw):
-        self.format = format
-        return super().__call__(**kw)
+    def setup(self, *, format="%m/%d/%y", **kw):
+        """The format can be a list of alternative formats."""
+        self.formats = (format,) if isinstance(format, str) else tuple(format)
+        self.format = " or ".join(self.formats)
+        self.parser = compile_formats(self.formats)
+        super().setup(**kw)
 
 
 class CKINT(CKUI):
-    """Gets an integer."""
+    """Gets an integer.
+
+    The ``base``, ``prefixes`` and ``suffixes`` options are
+    for an IntegerFormat. Without them, the answer is parsed by ``int()``.
+    """
     PROMPT = 'Enter an integer'
     HELP = 'Please enter an integer.'
     ERROR = 'ERROR - Please enter an integer.'
+    BASE_HELP = 'Please enter a base {base} integer.'
+    BASE_ERROR = 'ERROR - Please enter a base {base} integer.'
+    DECIMAL = re.compile(r"\s*[-+]?\d(?:_?\d)*\s*")
+
+    def help(self, full=False):
+        if self.base == 10:
+            return super().help(full)
+        return self.render(self.BASE_HELP)
+
+    def error(self):
+        if self.base == 10:
+            return super().error()
+        return self.render(self.BASE_ERROR)
     
     def validate(self, text):
         """Validate input, returns canonical string version of the integer."""
-        try:
-            return int(text)
-        except Exception:
+        if self.parser is None:
+            try:
+                return int(text)
+            except ValueError as ex:
+                raise Invalid from ex
+        value = self.parser.parse(text)
+        if value is None:
             raise Invalid
+        return value
+
+    BATCH = 4096
+
+    def validate_column(self, texts):
+        """Convert batches with ``map(int, ...)``. Only the batches which
+        have an invalid text are redone, checking each text with
+        ``DECIMAL`` first, so there's no exception per value.
+        """
+        if self.parser is not None:
+            return self.parser.parse_many(texts)
+        values = []
+        decimal = self.DECIMAL.fullmatch
+        for start in range(0, len(texts), self.BATCH):
+            batch = texts[start:start+self.BATCH]
+            try:
+                values.extend(list(map(int, batch)))
+            except ValueError:
+                for text in batch:
+                    try:
+                        values.append(int(text) if decimal(text) else None)
+                    except ValueError:
+                        values.append(None)
+        return values
+
+    def setup(self, *, base=10, prefixes=False, suffixes=False, **kw):
+        self.base = base
+        if (base, prefixes, suffixes) == (10, False, False):
+            self.parser = None
+        else:
+            self.parser = compile_integers(base, prefixes, suffixes)
+        super().setup(**kw)
 
 
 class InputType(int, Enum):
     NUMERIC = 1
     TEXT = 2
-    
+
+
+class PrefixIndex:
+    """A precompiled index of choices for CKITEM and CKKEYWD.
+
+    The visible ``menu`` keeps its original order for numeric selection.
+    The ``keys`` are the sorted choices (menu plus invisible), so a prefix
+    is resolved with two bisections instead of a pass over every item.
+
+    Build one of these for a large choice set and pass it as the ``choices``
+    to reuse it across prompts.
+
+    Suggestions come from a trigram index. For ``BACKGROUND`` or more
+    choices, building it takes long enough (seconds for 500,000) that it's
+    started in a background thread when the index is made, and until it's
+    ready the suggestions are ranked from the ``NEARBY`` choices on either
+    side of the text in sorted order, so no answer waits for the build.
+    Smaller indexes build it the first time it's needed.
+    """
+    POSTINGS = 20000
+    BACKGROUND = 20000
+    NEARBY = 100
+
+    def __init__(self, choices, invisible=None):
+        self.menu = list(choices)
+        self.items = self.menu + list(invisible if invisible is not None else [])
+        self.keys = sorted(self.items)
+        if len(self.keys) >= self.BACKGROUND:
+            self.start_ngrams()
+
+    def __getstate__(self):
+        state = dict(vars(self))
+        state.pop('building', None)
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        if 'grams' not in state and len(self.keys) >= self.BACKGROUND:
+            self.start_ngrams()
+
+    def __len__(self):
+        return len(self.items)
+
+    def select(self, item_num):
+        """Numeric selection, 1-based, or raise Invalid."""
+        if 1 <= item_num <= len(self.items):
+            return self.items[item_num-1]
+        raise Invalid(InputType.NUMERIC)
+
+    def span(self, prefix):
+        """The range of ``keys`` which start with the given prefix."""
+        lo = bisect.bisect_left(self.keys, prefix)
+        limit = self.successor(prefix)
+        hi = bisect.bisect_left(self.keys, limit, lo) if limit else len(self.keys)
+        return lo, hi
+
+    def matches(self, prefix):
+        """All choices which start with the given prefix."""
+        lo, hi = self.span(prefix)
+        return self.keys[lo:hi]
+
+    def prefixed(self, prefix):
+        """The choices which start with the given prefix, lazily."""
+        lo, hi = self.span(prefix)
+        return (self.keys[i] for i in range(lo, hi))
+
+    def unique(self, prefix):
+        """The one choice which starts with the prefix, or raise Invalid.
+        An ambiguous prefix is invalid.
+        """
+        lo, hi = self.span(prefix)
+        if hi - lo == 1:
+            return self.keys[lo]
+        raise Invalid(InputType.TEXT)
+
+    @staticmethod
+    def trigrams(text):
+        """The set of three-character substrings, padded to mark the ends."""
+        padded = "  {} ".format(text.lower())
+        return {padded[i:i+3] for i in range(len(padded)-2)}
+
+    def ngrams(self, wait=True):
+        """The trigram index: each trigram maps to the positions
+        in ``keys`` of the choices which contain it.
+
+        If it's being built in the background, this waits for it,
+        or returns None if ``wait`` is false.
+        """
+        grams = vars(self).get('grams')
+        if grams is None:
+            building = vars(self).get('building')
+            if building is not None:
+                if not wait and not building.is_set():
+                    return None
+                building.wait()
+                grams = vars(self).get('grams')
+            if grams is None:
+                # Threads which race here build equal indexes; any one will do.
+                self.grams = grams = self.build_ngrams()
+        return grams
+
+    def build_ngrams(self):
+        grams = defaultdict(list)
+        for n, key in enumerate(self.keys):
+            padded = "  {} ".format(key.lower())
+            for gram in {padded[i:i+3] for i in range(len(padded)-2)}:
+                grams[gram].append(n)
+        return dict(grams)
+
+    def start_ngrams(self):
+        """Build the trigram index in a background thread."""
+        building = self.building = threading.Event()
+
+        def build():
+            try:
+                self.grams = self.build_ngrams()
+            finally:
+                building.set()
+        threading.Thread(target=build, daemon=True).start()
+
+    def suggest(self, text, k=5):
+        """Up to k choices which are most like the text.
+
+        An ambiguous prefix suggests the first choices it matches.
+        Otherwise choices are ranked by the trigrams they share with
+        the text. The rarest trigrams are counted first, and counting stops
+        after ``POSTINGS`` positions, so the time is bounded. While the
+        trigram index is built in the background, only the nearby choices
+        are ranked.
+        """
+        lo, hi = self.span(text)
+        if hi - lo > 1:
+            return self.keys[lo:min(hi, lo+k)]
+        grams = self.trigrams(text)
+        index = self.ngrams(wait=False)
+        scores = Counter()
+        if index is None:
+            for n in range(max(0, lo - self.NEARBY), min(len(self.keys), lo + self.NEARBY)):
+                shared = len(grams & self.trigrams(self.keys[n]))
+                if shared:
+                    scores[n] = shared
+        else:
+            budget = self.POSTINGS
+            for positions in sorted((index[g] for g in grams if g in index), key=len):
+                if len(positions) > budget:
+                    break
+                scores.update(positions)
+                budget -= len(positions)
+
+        def similarity(n, shared):
+            return shared / (len(grams) + len(self.trigrams(self.keys[n])) - shared)
+        ranked = sorted(scores.most_common(k*4), key=lambda ns: (-similarity(*ns), ns[0]))
+        return [self.keys[n] for n, _ in ranked[:k]]
+
+    @staticmethod
+    def successor(prefix):
+        """The smallest string greater than every string which starts with prefix.
+        An empty string means there's no upper bound.
+        """
+        while prefix and prefix[-1] == chr(0x10FFFF):
+            prefix = prefix[:-1]
+        if not prefix:
+            return ''
+        return prefix[:-1] + chr(ord(prefix[-1])+1)
+
+
+class PagedChoices:
+    """Choices for CKITEM fetched from a source only as they're needed.
+
+    The source, e.g., a query of a database table, has three methods:
+
+    -   ``count()``, the number of menu items.
+    -   ``slice(start, stop)``, the menu items from start to stop.
+    -   ``prefix(prefix, limit)``, at most limit choices, visible or not,
+        which start with the prefix, in sorted order.
+
+    Menu items are fetched ``PAGE`` at a time, and the most recently used
+    ``PAGES`` pages are kept. The count is fetched once. CKITEM wraps a
+    source in one of these; build it once and pass it as the ``choices``
+    to share the cache across prompts.
+    """
+    PAGE = 100
+    PAGES = 16
+    CANDIDATES = 1000
+
+    def __init__(self, source):
+        from collections import OrderedDict
+        self.source = source
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def menu(self):
+        return self
+
+    items = menu
+
+    def __len__(self):
+        count = vars(self).get('count')
+        if count is None:
+            count = self.count = self.source.count()
+        return count
+
+    def page(self, n):
+        """One page of menu items, from the cache if it's there."""
+        with self.lock:
+            if n in self.cache:
+                self.cache.move_to_end(n)
+                return self.cache[n]
+        items = list(self.source.slice(n*self.PAGE, (n+1)*self.PAGE))
+        with self.lock:
+            self.cache[n] = items
+            while len(self.cache) > self.PAGES:
+                self.cache.popitem(last=False)
+        return items
+
+    def __getitem__(self, position):
+        """A menu item, or a slice of them, which only fetches its pages."""
+        if isinstance(position, slice):
+            start, stop, step = position.indices(len(self))
+            if step != 1:
+                return [self[n] for n in range(start, stop, step)]
+            items = []
+            for n in range(start // self.PAGE, -(-stop // self.PAGE)):
+                page = self.page(n)
+                items.extend(page[max(start - n*self.PAGE, 0):stop - n*self.PAGE])
+            return items
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.page(position // self.PAGE)[position % self.PAGE]
+
+    def select(self, item_num):
+        """Numeric selection, 1-based, or raise Invalid."""
+        if 1 <= item_num <= len(self):
+            return self[item_num-1]
+        raise Invalid(InputType.NUMERIC)
+
+    def unique(self, prefix):
+        """The one choice which starts with the prefix, or raise Invalid."""
+        found = list(self.source.prefix(prefix, 2))
+        if len(found) == 1:
+            return found[0]
+        raise Invalid(InputType.TEXT)
+
+    def prefixed(self, prefix):
+        """Up to ``CANDIDATES`` choices which start with the prefix."""
+        return iter(self.source.prefix(prefix, self.CANDIDATES))
+
+    def suggest(self, text, k=5):
+        """Up to k choices which share the longest prefix with the text."""
+        for end in range(len(text), 0, -1):
+            found = list(self.source.prefix(text[:end], k))
+            if found:
+                return found
+        return []
+
+
+class LiveFilter:
+    """The state of a live, fzf-style choice from a CKITEM menu.
+
+    Each key typed narrows the visible choices to those which start with
+    the query. The new range is found by bisecting within the previous range,
+    so a keystroke costs O(log n) whatever the size of the menu, and
+    backspace pops back to the previous range.
+    """
+    UP = ('\x1b[A', '\x10')
+    DOWN = ('\x1b[B', '\x0e')
+    ENTER = ('\r', '\n')
+    BACKSPACE = ('\x7f', '\x08')
+
+    def __init__(self, spec, rows=10):
+        index = spec.index
+        if not isinstance(index, PrefixIndex):
+            raise TypeError("A live choice needs the choices in a PrefixIndex, not {}".format(
+                type(index).__name__))
+        self.spec = spec
+        # Invisible choices are never shown, only validated when typed.
+        self.keys = index.keys if len(index.keys) == len(index.menu) else sorted(index.menu)
+        self.rows = rows
+        self.query = ''
+        self.spans = [(0, len(self.keys))]
+        self.cursor = 0
+        self.top = 0
+
+    def __len__(self):
+        lo, hi = self.spans[-1]
+        return hi - lo
+
+    def type(self, text):
+        """Narrow the choices, one character at a time."""
+        for char in text:
+            self.query += char
+            lo, hi = self.spans[-1]
+            lo = bisect.bisect_left(self.keys, self.query, lo, hi)
+            limit = PrefixIndex.successor(self.query)
+            hi = bisect.bisect_left(self.keys, limit, lo, hi) if limit else hi
+            self.spans.append((lo, hi))
+        self.cursor = self.top = 0
+
+    def backspace(self):
+        if self.query:
+            self.query = self.query[:-1]
+            self.spans.pop()
+        self.cursor = self.top = 0
+
+    def move(self, step):
+        """Move the highlight, scrolling the visible rows."""
+        self.cursor = max(0, min(len(self)-1, self.cursor+step))
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.rows:
+            self.top = self.cursor - self.rows + 1
+
+    def choice(self):
+        """The highlighted choice. With no matches, the query is validated
+        like typed input, so a menu number still works. None if invalid.
+        """
+        if len(self):
+            return self.keys[self.spans[-1][0] + self.cursor]
+        try:
+            return self.spec.validate(self.query)
+        except Invalid:
+            return None
+
+    def key(self, key):
+        """Handle one key. Returns the choice for Enter, otherwise None.
+        Raises UserQuit for Escape and EndOfInput for Ctrl-D.
+        """
+        if key in self.ENTER:
+            return self.choice()
+        elif key == '\x04':
+            raise EndOfInput
+        elif key == '\x1b':
+            raise UserQuit
+        elif key in self.BACKSPACE:
+            self.backspace()
+        elif key in self.UP:
+            self.move(-1)
+        elif key in self.DOWN:
+            self.move(1)
+        elif key.isprintable():
+            self.type(key)
+        return None
+
+    @staticmethod
+    def split(data):
+        """The keys in a chunk of terminal input; arrows are one key."""
+        return re.findall(r"\x1b\[[0-9;]*[A-Za-z~]|.", data, re.DOTALL)
+
+    def render(self, prompt):
+        """The lines to draw: the query, a count, and the visible rows."""
+        lo, _ = self.spans[-1]
+        first = lo + self.top
+        lines = ["{}: {}".format(prompt, self.query), "  {:,} of {:,}".format(len(self), len(self.keys))]
+        for n in range(first, first + min(self.rows, len(self) - self.top)):
+            lines.append("{} {}".format(">" if n - lo == self.cursor else " ", self.keys[n]))
+        return lines
+
+
 class CKITEM(CKUI):
-    """Gets an item from a menu."""
+    """Gets an item from a menu.
+
+    A list of choices is indexed (with a sort) each time the prompt is
+    configured, so the menu is always the list as it is now. For a large
+    menu used more than once, build a PrefixIndex and pass that as the
+    ``choices`` instead.
+    """
     PROMPT = 'Enter selection'
     HELP = '''
 Enter the number of the menu item you wish to select, the token
@@ -161,146 +1495,388 @@ of the menu item you wish to select, the token which is associated
 with the menu item, or a partial string which uniquely identifies the
 token for the menu item. Enter ?? to reprint the menu.
 '''
+    SUGGEST = 'Did you mean {}?'
+    SUGGESTIONS = 5
     HINT = '?,??,q'
+    PAGED_HINT = '?,??,<,>,q'
+    PAGE_SIZE = None
+    COLUMNS = 1
     
     def validate(self, text):
         """Validate input, returns canonical form or raise Invalid exception."""
         try:
             item_num = int(text)
-            if 1 <= item_num <= len(self.items):
-                return self.items[item_num-1]
-            raise Invalid(InputType.NUMERIC)
         except ValueError:
-            text_lower = text.lower()
-            matches = []
-            for item in self.items:
-                if item.startswith(text_lower):
-                    matches.append(item)
-            if len(matches) == 1:
-                return matches[0]
-            raise Invalid(InputType.TEXT)
+            return self.index.unique(text.lower())
+        return self.index.select(item_num)
     
-    def show_menu(self):
-        """Show the menu of choices."""
-        if self.label:
-            print(self.label)
-        for n, item in enumerate(self.menu, 1):
-            print("{}: {}".format(n, item))
-            
-    def __call__(self, *, prompt=None, default=None, help=None, error=None,
-        label=None, choices=None, invisible=None):
-        if prompt is None:
-            prompt = self.PROMPT
-        if error is None:
-            error = self.ERROR
+    def hint(self):
+        """The hint includes the paging commands when the menu is paged."""
+        if self.pages > 1:
+            return self.render(self.PAGED_HINT, self.LIMIT)
+        return super().hint()
+
+    def render_menu(self, page=0):
+        """The label and one page of the menu as one block of text.
+
+        Only the items on the page are formatted, so the cost doesn't
+        depend on the size of the whole menu.
+        """
+        lines = [self.label] if self.label else []
+        size = self.page_size or len(self.menu)
+        start = page * size
+        entries = [
+            "{}: {}".format(n, item)
+            for n, item in enumerate(self.menu[start:start+size], start+1)
+        ]
+        if self.columns > 1 and entries:
+            width = max(map(len, entries))
+            rows = -(-len(entries) // self.columns)
+            for row in range(rows):
+                lines.append("  ".join(e.ljust(width) for e in entries[row::rows]).rstrip())
+        else:
+            lines.extend(entries)
+        if self.pages > 1:
+            lines.append("Page {} of {}. Enter < or > for the previous or next page.".format(
+                page+1, self.pages))
+        return "\n".join(lines)
+
+    def show_menu(self, page=0):
+        """Show a page of the menu of choices with one write."""
+        print(self.render_menu(page))
+
+    def live(self, *, prompt=None, rows=10, **options):
+        """Choose an item by typing, with the choices narrowed on each key.
+
+        This puts the terminal on stdin in cbreak mode and draws on stdout.
+        Up and down (or Ctrl-P and Ctrl-N) move the highlight, Enter selects,
+        and Escape quits.
+
+        Returns the selected item.
+        Raises UserQuit when the user quits, and TypeError for choices
+        from a PagedChoices source, which can't be filtered.
+        """
+        import termios
+        import tty
+        configured = self.spec(**options)
+        chooser = LiveFilter(configured, rows)
+        prompt = prompt if prompt is not None else configured.PROMPT
+        fd = sys.stdin.fileno()
+        saved = termios.tcgetattr(fd)
+        try:
+            # TCSANOW keeps any keys typed ahead.
+            tty.setcbreak(fd, termios.TCSANOW)
+            while True:
+                # Redraw below the cursor, then go back to the end of the query.
+                lines = chooser.render(prompt)
+                sys.stdout.write("\r\x1b[J{}\x1b[{}A\r\x1b[{}C".format(
+                    "\r\n".join(lines), len(lines) - 1, len(lines[0])))
+                sys.stdout.flush()
+                data = os.read(fd, 64).decode(errors='replace')
+                if not data:
+                    raise EndOfInput
+                for key in chooser.split(data):
+                    choice = chooser.key(key)
+                    if choice is not None:
+                        return choice
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+            sys.stdout.write("\r\x1b[J")
+            sys.stdout.flush()
+
+    def explain(self, text, ex):
+        """The numeric or text error; for text, with suggestions from the index."""
+        if ex.args and ex.args[0] == InputType.NUMERIC:
+            return self.render(self.NUM_ERROR, self.LIMIT)
+        message = self.render(self.TXT_ERROR, self.LIMIT)
+        suggestions = self.index.suggest(text.lower(), self.SUGGESTIONS)
+        if suggestions:
+            message = "{}\n{}".format(message.rstrip(), self.SUGGEST.format(", ".join(suggestions)))
+        return message
+
+    def candidates(self, text):
+        """The menu items which start with the text."""
+        return self.index.prefixed(text.lower())
+
+    def intro(self, state):
+        """The menu is shown before the first prompt."""
+        state['page'] = 0
+        return self.render_menu()
+
+    def command(self, text, state):
+        """?? reprints the current page; < and > turn the pages."""
+        if text in ['??']:
+            return self.render_menu(state['page'])
+        elif text in ['<', '>'] and self.pages > 1:
+            step = 1 if text == '>' else -1
+            state['page'] = max(0, min(self.pages-1, state['page']+step))
+            return self.render_menu(state['page'])
+        return None
+
+    def setup(self, *, label=None, choices=None, invisible=None,
+        page_size=None, columns=None, **kw):
+        """The choices can be a list, a PrefixIndex, or a source
+        for PagedChoices, which is shown a page at a time.
+        """
         if choices is None:
             raise ValueError("No choices given")
         self.label = label
-        self.menu = choices
-        self.items = choices + (invisible if invisible is not None else [])
-        self.show_menu()
-        response = None
-        while not response:
-            try:
-                a=input("{} [{}]: ".format(prompt, self.hint()))
-            except EOFError:
-                raise UserQuit
-            if a.lower() in ['q', 'quit']:
-                raise UserQuit
-            elif a in ['?']:
-                print(help if help is not None else self.help())
-            elif a in ['??']:
-                self.show_menu()
-            elif a == '' and default is not None:
-                response = default
-            else:
-                try:
-                    response = self.validate(a)
-                except Invalid:
-                    print(self.error())
-        return response
+        self.page_size = page_size if page_size is not None else self.PAGE_SIZE
+        self.columns = columns if columns is not None else self.COLUMNS
+        if isinstance(choices, (PrefixIndex, PagedChoices)):
+            self.index = choices
+        elif hasattr(choices, 'slice') and hasattr(choices, 'prefix'):
+            if invisible is not None:
+                raise ValueError("Invisible choices must come from the source")
+            self.index = PagedChoices(choices)
+        else:
+            self.index = PrefixIndex(choices, invisible)
+        if isinstance(self.index, PagedChoices) and self.page_size is None:
+            self.page_size = self.index.PAGE
+        self.menu = self.index.menu
+        self.items = self.index.items
+        self.pages = -(-len(self.menu) // self.page_size) if self.page_size else 1
+        super().setup(**kw)
 
 
 class CKKEYWD(CKUI):
-    """Gets a keyword from a list of choices."""
+    """Gets a keyword from a list of choices.
+
+    As for CKITEM, pass a PrefixIndex as the ``keywords`` to index a
+    large list only once.
+    """
     PROMPT = 'Enter appropriate value'
     HELP = '{keywords},q'
     ERROR = 'ERROR: Please enter one of the following keywords: {keywords},q'
     HINT = '{keywords},?,q'
+    MORE = True
+    SUGGEST = 'Did you mean {}?'
+    SUGGESTIONS = 5
 
     def validate(self, text):
         """Validate input, returns canonical string version of the keyword."""
-        text_lower = text.lower()
-        matches = []
-        for item in self.items:
-            if item.startswith(text_lower):
-                matches.append(item)
-        if len(matches) == 1:
-            return matches[0]
-        raise Invalid(InputType.TEXT)
+        return self.index.unique(text.lower())
 
-    def __call__(self, *, keywords=None, **kw):
-        self.format = format
+    def explain(self, text, ex):
+        """The error, with suggestions from the index."""
+        suggestions = self.index.suggest(text.lower(), self.SUGGESTIONS)
+        if suggestions:
+            return "{}\n{}".format(self.error(), self.SUGGEST.format(", ".join(suggestions)))
+        return self.error()
+
+    def candidates(self, text):
+        """The keywords which start with the text."""
+        return self.index.prefixed(text.lower())
+
+    def setup(self, *, keywords=None, **kw):
         if keywords is None:
             raise ValueError("No keywords given")
-        self.items = keywords
-        self.keywords = ','.join(self.items)
-        return super().__call__(**kw)
+        if isinstance(keywords, PrefixIndex):
+            self.index = keywords
+        else:
+            self.index = PrefixIndex(keywords)
+        self.items = self.index.menu
+        self.keywords = self.items
+        super().setup(**kw)
+
+
+class FileCache:
+    """A short-lived cache of ``os.stat()``, ``os.access()`` and
+    ``os.scandir()`` results.
+
+    Re-prompting, or validating many paths on a slow network mount,
+    reuses results which are less than ``ttl`` seconds old. At most
+    ``size`` results are kept.
+    """
+    def __init__(self, ttl=2.0, size=10000):
+        self.ttl = ttl
+        self.size = size
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, key, compute):
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        value = compute()
+        with self.lock:
+            if len(self.entries) >= self.size:
+                self.entries = {k: e for k, e in self.entries.items() if now - e[0] < self.ttl}
+                if len(self.entries) >= self.size:
+                    self.entries = {}
+            self.entries[key] = (now, value)
+        return value
+
+    def invalidate(self):
+        self.entries = {}
+
+    def stat(self, path):
+        """The stat result for a path, or None if it can't be found."""
+        def compute():
+            try:
+                return os.stat(path)
+            except (OSError, ValueError):
+                return None
+        return self.lookup(('stat', path), compute)
+
+    def access(self, path, mode):
+        """True if the path can be accessed with all of the mode bits."""
+        return self.lookup(('access', path, mode), lambda: os.access(path, mode))
+
+    def scandir(self, directory):
+        """The (name, is_dir) pairs for the entries of a directory."""
+        def compute():
+            try:
+                with os.scandir(directory) as entries:
+                    return [(e.name, e.is_dir()) for e in entries]
+            except OSError:
+                return []
+        return self.lookup(('scandir', directory), compute)
 
 
 class CKPATH(CKUI):
-    """Gets a path. This is abstract. A concrete subclass must implement
-    the validation rule.
+    """Gets a path. The rules are the ckpath(1) option letters.
         
-    - Absolute vs. Relative
-    - New vs. Existing
-    - Readable and/or Writable and/or Executable
-    - Block v. Character
-    - Regular file v. Directory
-    - Non-zero Size
-    
-    This class validates absolute paths.
+    - Absolute vs. Relative: a, l
+    - New vs. Existing: n, o
+    - Readable and/or Writable and/or Executable: r, w, x,
+      or creatable: t
+    - Block v. Character: b, c
+    - Regular file v. Directory: f, y
+    - Non-zero Size: z
+
+    The rules in each group of ``EXCLUSIVE`` can't be combined.
+
+    All the rules are checked with one ``os.stat()`` and one
+    ``os.access()``, cached briefly in ``FILES``.
+
+    By default, this class validates absolute paths.
     """
     PROMPT = "Enter a pathname"
-    HELP = "Enter a pathname"
-    ERROR = "ERROR: Invalid pathname"
+    HELP = "Enter a pathname which {requirements}."
+    ERROR = "ERROR: Invalid pathname. The pathname {requirements}."
+    RULES = {
+        'a': "must begin with a slash (/)",
+        'l': "must not begin with a slash (/)",
+        'n': "must not already exist",
+        'o': "must already exist",
+        'b': "must be a block special file",
+        'c': "must be a character special file",
+        'f': "must be a regular file",
+        'y': "must be a directory",
+        'z': "must have a non-zero size",
+        'r': "must be readable",
+        'w': "must be writable",
+        'x': "must be executable",
+        't': "must be creatable",
+    }
+    TYPES = {'b': stat.S_ISBLK, 'c': stat.S_ISCHR, 'f': stat.S_ISREG, 'y': stat.S_ISDIR}
+    EXCLUSIVE = ('al', 'no', 'bcfy')
+    FILES = FileCache()
+
+    def setup(self, *, rules='a', **kw):
+        unknown = set(rules) - set(self.RULES)
+        if unknown:
+            raise ValueError("Unknown rules {}".format("".join(sorted(unknown))))
+        for group in self.EXCLUSIVE:
+            conflict = [rule for rule in group if rule in rules]
+            if len(conflict) > 1:
+                raise ValueError("Mutually exclusive rules {}".format("".join(conflict)))
+        self.rules = rules
+        requirements = [self.RULES[rule] for rule in rules]
+        self.requirements = (
+            ", ".join(requirements[:-1]) + " and " + requirements[-1]
+            if len(requirements) > 1 else "".join(requirements) or "can be any name")
+        self.mode = (
+            (os.R_OK if 'r' in rules else 0)
+            | (os.W_OK if 'w' in rules else 0)
+            | (os.X_OK if 'x' in rules else 0))
+        super().setup(**kw)
     
     def validate(self, text):
-        """Validation which checks for an absolute path.
-        Returns canonical string representation.
+        """Validation which checks the rules.
+        Returns the absolute path.
         """
-        try:
-            p = pathlib.Path(text)
-            if p.root == '/':
-                return p.absolute()
-            raise Invalid
-        except FileNotFoundError:
-            raise Invalid
+        p = pathlib.Path(text)
+        rules = self.rules
+        if 'a' in rules and p.root != '/':
+            raise Invalid(self.RULES['a'])
+        if 'l' in rules and p.root == '/':
+            raise Invalid(self.RULES['l'])
+        if rules.strip('al'):
+            st = self.FILES.stat(text)
+            if st is None:
+                if self.mode or any(rule in rules for rule in 'ozbcfy'):
+                    raise Invalid(self.RULES['o'])
+                parent = str(p.parent)
+                if 't' in rules and not self.FILES.access(parent, os.W_OK | os.X_OK):
+                    raise Invalid(self.RULES['t'])
+            else:
+                if 'n' in rules:
+                    raise Invalid(self.RULES['n'])
+                for rule, is_type in self.TYPES.items():
+                    if rule in rules and not is_type(st.st_mode):
+                        raise Invalid(self.RULES[rule])
+                if 'z' in rules and st.st_size == 0:
+                    raise Invalid(self.RULES['z'])
+                mode = self.mode | (os.W_OK if 't' in rules else 0)
+                if mode and not self.FILES.access(text, mode):
+                    raise Invalid(", ".join(self.RULES[r] for r in 'rwxt' if r in rules))
+        return p.absolute()
+
+    def candidates(self, text):
+        """The entries of the directory which start with the text.
+        Directories end with a slash.
+        """
+        head, slash, prefix = text.rpartition('/')
+        directory = head + slash
+        for name, is_dir in self.FILES.scandir(directory or '.'):
+            if name.startswith(prefix):
+                yield directory + name + ('/' if is_dir else '')
     
 class CKRANGE(CKINT):
     """Gets an integer in a range."""
     PROMPT = 'Enter an integer'
     HELP = 'Please enter an integer between {lower} and {upper}.'
     ERROR = 'ERROR - Please enter an integer between {lower} and {upper}.'
+    BASE_HELP = 'Please enter a base {base} integer between {lower} and {upper}.'
+    BASE_ERROR = 'ERROR - Please enter a base {base} integer between {lower} and {upper}.'
     
     def validate(self, text):
         """Validate input, returns canonical string version of the integer."""
-        try:
-            v = int(text)
-            if self.lower <= v <= self.upper:
-                return v
-            raise Invalid
-        except Exception:
-            raise Invalid
+        v = super().validate(text)
+        if self.lower <= v <= self.upper:
+            return v
+        raise Invalid
+
+    def validate_column(self, texts):
+        lower, upper = self.lower, self.upper
+        return [
+            v if v is not None and lower <= v <= upper else None
+            for v in super().validate_column(texts)]
             
-    def __call__(self, *, lower=-2**31, upper=2**31-1, **kw):
+    def setup(self, *, lower=-2**31, upper=2**31-1, **kw):
         self.lower = lower
         self.upper = upper
-        return super().__call__(**kw)
+        super().setup(**kw)
 
 
 class CKSTR(CKINT):
     """Gets an string that matches a regular expression."""
+    PATTERN_HELP = "Please enter a sptring that matches the following pattern:\n{pattern}"
+    PATTERN_ERROR = "ERROR: " + PATTERN_HELP
+    validate_column = CKUI.validate_column
+
+    def help(self, full=False):
+        if self.regexp is None:
+            return super().help(full)
+        return self.render(self.PATTERN_HELP)
+
+    def error(self):
+        if self.regexp is None:
+            return super().error()
+        return self.render(self.PATTERN_ERROR)
     
     def validate(self, text):
         """Validate input, returns canonical string."""
@@ -314,12 +1890,10 @@ class CKSTR(CKINT):
         except Exception:
             raise Invalid
             
-    def __call__(self, *, regexp=None, **kw):
-        if regexp is not None:
-            self.regexp = re.compile(regexp)
-            self.HELP = "Please enter a sptring that matches the following pattern:\n{}".format(regexp)
-            self.ERROR = "ERROR: {}".format(self.HELP)
-        return super().__call__(**kw)
+    def setup(self, *, regexp=None, **kw):
+        self.pattern = regexp
+        self.regexp = re.compile(regexp) if regexp is not None else None
+        super().setup(**kw)
 
 
 class CKTIME(CKUI):
@@ -331,16 +1905,17 @@ class CKTIME(CKUI):
     def validate(self, text):
         """Validate input, returns canonical string time."""
         try:
-            dt = datetime.datetime.strptime(text, self.format)
+            dt = self.parser.parse(text)
             return dt.time()
-        except Exception as ex:
-            if self.DEBUG: 
-                print(ex)
-            raise Invalid
+        except ValueError as ex:
+            raise Invalid from ex
         
-    def __call__(self, *, format="%H:%M:%S", **kw):
-        self.format = format
-        return super().__call__(**kw)
+    def setup(self, *, format="%H:%M:%S", **kw):
+        """The format can be a list of alternative formats."""
+        self.formats = (format,) if isinstance(format, str) else tuple(format)
+        self.format = " or ".join(self.formats)
+        self.parser = compile_formats(self.formats)
+        super().setup(**kw)
 
 
 class CKYORN(CKUI):
@@ -362,15 +1937,294 @@ To respond in the negative, enter n, no, N, or NO.
             return clean_text
         raise Invalid
 
+    def validate_column(self, texts):
+        answers = dict(self.CANONICAL, **{v: v for v in self.CANONICAL.values()})
+        return list(map(answers.get, map(str.lower, texts)))
+
+
+class NameSet(frozenset):
+    """A set of names for fast membership tests.
+
+    The original order is kept in ``order`` so the names display the
+    way they appear in the source file.
+    """
+    def __new__(cls, names=()):
+        order = tuple(dict.fromkeys(names))
+        self = super().__new__(cls, order)
+        self.order = order
+        return self
+
+    def __str__(self):
+        return ','.join(self.order)
+
+    def prefixed(self, prefix):
+        """The names which start with prefix, in sorted order, lazily.
+        The sorted names are built on first use.
+        """
+        keys = vars(self).get('keys')
+        if keys is None:
+            keys = self.keys = sorted(self.order)
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            yield keys[i]
+
+
+class MappedNames:
+    """The names in an index file, memory-mapped, for membership tests
+    without parsing the source file.
+
+    The file has a header, with the ``(inode, mtime, size)`` stamp of the
+    source file, two tables of offsets, the names in sorted order and in
+    their original order, and the names, each one length-prefixed. Lookups
+    bisect the sorted table in place. Processes which map the same file
+    share one copy of it.
+
+    The ``exclude`` function is applied to the (lower-case) names as
+    they're used.
+
+    Only a file owned by the effective user or root, and not writable by
+    group or others, is trusted; any other raises ValueError.
+    """
+    MAGIC = b"CLUXNAM1"
+    HEADER = "=8sQqQQ"
+
+    def __init__(self, path, exclude=None):
+        import mmap
+        import struct
+        self.path = path
+        self.exclude = exclude
+        with open(path, "rb") as index:
+            st = os.fstat(index.fileno())
+            if st.st_uid not in (0, os.geteuid()) or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                raise ValueError("{} is not a trusted name index".format(path))
+            self.map = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        header = struct.calcsize(self.HEADER)
+        if len(self.map) < header:
+            raise ValueError("{} is too short for a name index".format(path))
+        magic, *stamp, count = struct.unpack_from(self.HEADER, self.map)
+        if magic != self.MAGIC:
+            raise ValueError("{} is not a name index".format(path))
+        if len(self.map) < header + 8*count:
+            raise ValueError("{} is a truncated name index".format(path))
+        self.stamp = tuple(stamp)
+        tables = memoryview(self.map)[header:header + 8*count].cast("I")
+        self.sorted, self.original = tables[:count], tables[count:]
+
+    @classmethod
+    def write(cls, path, stamp, names):
+        """Write an index file for the names, atomically replacing any old one.
+        The file is readable by everyone, and writable only by its owner.
+        """
+        import struct
+        import tempfile
+        names = [name.encode() for name in dict.fromkeys(names)]
+        start = struct.calcsize(cls.HEADER) + 8*len(names)
+        offsets = []
+        for name in names:
+            offsets.append(start)
+            start += 2 + len(name)
+        ranks = sorted(range(len(names)), key=names.__getitem__)
+        fd, temporary = tempfile.mkstemp(
+            prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+        try:
+            with open(fd, "wb") as index:
+                os.fchmod(index.fileno(), 0o644)
+                index.write(struct.pack(cls.HEADER, cls.MAGIC, *stamp, len(names)))
+                index.write(struct.pack("={}I".format(2*len(names)),
+                    *(offsets[n] for n in ranks), *offsets))
+                for name in names:
+                    index.write(struct.pack("=H", len(name)) + name)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def __reduce__(self):
+        return type(self), (self.path, self.exclude)
+
+    def name(self, offset):
+        """The encoded name at an offset."""
+        size = int.from_bytes(self.map[offset:offset+2], sys.byteorder)
+        return self.map[offset+2:offset+2+size]
+
+    def bisect(self, key):
+        """The position in the sorted table of the first name >= key."""
+        lo, hi = 0, len(self.sorted)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.name(self.sorted[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, name):
+        key = name.encode()
+        n = self.bisect(key)
+        return (n < len(self.sorted) and self.name(self.sorted[n]) == key
+            and (self.exclude is None or not self.exclude(name)))
+
+    @property
+    def order(self):
+        """The names in their original order. Decoded on first use."""
+        order = vars(self).get('names')
+        if order is None:
+            order = self.names = tuple(
+                name for name in (self.name(offset).decode() for offset in self.original)
+                if self.exclude is None or not self.exclude(name))
+        return order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __str__(self):
+        return ','.join(self.order)
+
+    def prefixed(self, prefix):
+        """The names which start with prefix, in sorted order, lazily."""
+        key = prefix.encode()
+        for n in range(self.bisect(key), len(self.sorted)):
+            name = self.name(self.sorted[n])
+            if not name.startswith(key):
+                break
+            name = name.decode()
+            if self.exclude is None or not self.exclude(name):
+                yield name
+
+
+class Directory:
+    """A cache of the names in a colon-delimited database like /etc/passwd.
+
+    The file is reread only when its inode, modification time or size
+    changes. When ``nss`` names the ``pwd`` or ``grp`` module, the names
+    it enumerates (from LDAP, NIS, etc.) can be included, too.
+
+    With an ``index`` filename, the names are kept in a MappedNames index
+    file, shared by every process on the host. It's rebuilt when the
+    source file changes. The index is used unless NSS names are included.
+    """
+    def __init__(self, filename, nss=None, index=None):
+        self.filename = filename
+        self.nss = nss
+        self.index = index
+        self.stamp = None
+        self.names = NameSet()
+        self.results = {}
+        self.maps = {}
+        self.lock = threading.RLock()
+
+    def invalidate(self):
+        """Force a reload on the next request."""
+        with self.lock:
+            self.stamp = None
+            self.results = {}
+            self.maps = {}
+
+    def load(self, path):
+        """Parse the names from the first field of each line."""
+        lines = path.read_text().splitlines()
+        no_comment = filter(None, (line.partition('#')[0] for line in lines))
+        return NameSet(line.split(":", 1)[0] for line in no_comment)
+
+    def enumerate(self):
+        """All names known to the name service switch."""
+        if self.nss == 'pwd':
+            import pwd
+            return [p.pw_name for p in pwd.getpwall()]
+        elif self.nss == 'grp':
+            import grp
+            return [g.gr_name for g in grp.getgrall()]
+        return []
+
+    def refresh(self):
+        """Reload the file if it changed since the last request."""
+        path = pathlib.Path(self.filename)
+        stamp = self.stat(path)
+        with self.lock:
+            if stamp != self.stamp or stamp is None:
+                self.names = self.load(path) if stamp is not None else NameSet()
+                self.stamp = stamp
+                self.results = {}
+
+    @staticmethod
+    def stat(path):
+        """The (inode, mtime, size) stamp of the file, or None."""
+        try:
+            st = path.stat()
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def mapped(self, exclude):
+        """The lower-case names from the index file, rebuilt if it's
+        missing or stale. None if the index can't be used.
+        """
+        path = pathlib.Path(self.filename)
+        stamp = self.stat(path)
+        if stamp is None:
+            return None
+        key = (exclude, stamp)
+        if key not in self.maps:
+            import struct
+            try:
+                names = MappedNames(self.index, exclude)
+                if names.stamp != stamp:
+                    names = None
+            except (OSError, ValueError, struct.error):
+                names = None
+            try:
+                if names is None:
+                    MappedNames.write(
+                        self.index, stamp, (n.lower() for n in self.load(path).order))
+                    names = MappedNames(self.index, exclude)
+            except OSError:
+                return None
+            self.maps = {k: v for k, v in self.maps.items() if k[1] == stamp}
+            self.maps[key] = names
+        return self.maps[key]
+
+    def get(self, exclude=None, nss=False):
+        """The lower-case names, without excluded names, as a NameSet,
+        or as MappedNames from the index file.
+        """
+        with self.lock:
+            if self.index is not None and not nss:
+                names = self.mapped(exclude)
+                if names is not None:
+                    return names
+            self.refresh()
+            key = (exclude, nss)
+            if key not in self.results:
+                names = self.names.order + (tuple(self.enumerate()) if nss else ())
+                self.results[key] = NameSet(
+                    n.lower() for n in names if exclude is None or not exclude(n))
+            return self.results[key]
+
+
+def index_file(name):
+    """The path of a name index in the $CLUX_INDEX directory, or None
+    if it isn't set.
+    """
+    directory = os.environ.get('CLUX_INDEX')
+    return os.path.join(directory, "clux-{}.idx".format(name)) if directory else None
+
 
 class CKGID(CKUI):
     """Gets a group name.  Linux-specific
     
     Uses /etc/group. Filters leading _ group names.
+    Set ``NSS`` to include the groups known via the ``grp`` module.
     """
     PROMPT = 'Enter the name of an existing group'
     HELP = 'Please enter one of the following group names: {groups}'
     ERROR = 'ERROR - Please enter one of the following group names: {groups}'
+    DIRECTORY = Directory("/etc/group", nss='grp', index=index_file("group"))
+    NSS = False
+    MORE = True
     
     def validate(self, text):
         name = text.lower()
@@ -383,25 +2237,29 @@ class CKGID(CKUI):
         return name.startswith("_")
         
     def get_groups(self):
-        Group = namedtuple('Group', ['group', 'passwd', 'gid', 'member'])
-        lines = pathlib.Path("/etc/group").read_text().splitlines()
-        no_comment = filter(None, (lines.partition('#')[0] for lines in lines))
-        group_iter = (Group(*line.split(":")) for line in no_comment)
-        return list(g.group.lower() for g in group_iter if not self.exclude(g.group))
+        return self.DIRECTORY.get(self.exclude, self.NSS)
+
+    def candidates(self, text):
+        """The group names which start with the text."""
+        return self.groups.prefixed(text.lower())
         
-    def __call__(self, **kw):
+    def setup(self, **kw):
         self.groups = self.get_groups()
-        return super().__call__(**kw)
+        super().setup(**kw)
         
         
 class CKUID(CKUI):
     """Gets a user name.
     
     Uses /etc/passwd.
+    Set ``NSS`` to include the users known via the ``pwd`` module.
     """
     PROMPT = 'Enter the name of an existing user'
     HELP = 'Please enter one of the following user names: {users}'
     ERROR = 'ERROR - Please enter one of the following user names: {users}'
+    DIRECTORY = Directory("/etc/passwd", nss='pwd', index=index_file("passwd"))
+    NSS = False
+    MORE = True
     
     def validate(self, text):
         name = text.lower()
@@ -410,15 +2268,15 @@ class CKUID(CKUI):
         raise Invalid
         
     def get_users(self):
-        User = namedtuple('User', ['name', 'passwd', 'uid', 'gid', 'gecos', 'home', 'shell'])
-        lines = pathlib.Path("/etc/passwd").read_text().splitlines()
-        no_comment = filter(None, (lines.partition('#')[0] for lines in lines))
-        user_iter = (User(*line.split(":")) for line in no_comment)
-        return list(g.name.lower() for g in user_iter)
+        return self.DIRECTORY.get(None, self.NSS)
+
+    def candidates(self, text):
+        """The user names which start with the text."""
+        return self.users.prefixed(text.lower())
         
-    def __call__(self, **kw):
+    def setup(self, **kw):
         self.users = self.get_users()
-        return super().__call__(**kw)
+        super().setup(**kw)
 
 
 ckdate = CKDATE()
@@ -433,10 +2291,369 @@ cktime = CKTIME()
 ckuid = CKUID()
 ckyorn = CKYORN()
 
+class Session:
+    """One operator's connection to a prompt server.
+
+    The flow given to ``serve()`` uses a session to ask questions
+    and show results.
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def ask(self, ck, **options):
+        """Ask with one of the prompt objects, like ``ckint``."""
+        return await ck.ask_async(reader=self.reader, writer=self.writer, **options)
+
+    async def print(self, text):
+        """Show text to the operator."""
+        self.writer.write((text + "\n").encode())
+        await self.writer.drain()
+
+
+async def serve(flow, *, host=None, port=None, path=None, limit=None):
+    """Start a server that runs ``await flow(session)`` for each connection.
+
+    Listens on TCP with ``host`` and ``port``, or on a Unix-domain socket
+    with ``path``. At most ``limit`` sessions run at once; the other
+    connections wait. All sessions share one process, so the user and group
+    directories, compiled formats, and prebuilt indexes are loaded once.
+
+    Returns the ``asyncio.Server``.
+    """
+    import asyncio
+    sessions = asyncio.Semaphore(limit) if limit else None
+
+    async def connected(reader, writer):
+        try:
+            if sessions is not None:
+                async with sessions:
+                    await flow(Session(reader, writer))
+            else:
+                await flow(Session(reader, writer))
+        except (UserQuit, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    if path is not None:
+        return await asyncio.start_unix_server(connected, path=path)
+    return await asyncio.start_server(connected, host, port)
+
+
+async def client(answers, *, host=None, port=None, path=None):
+    """A loopback client for a prompt server.
+
+    Sends the answers, one per line, then returns everything
+    the server wrote as text.
+    """
+    import asyncio
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write("".join(a + "\n" for a in answers).encode())
+    await writer.drain()
+    writer.write_eof()
+    transcript = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return transcript.decode()
+
+
+PROMPTS = {
+    'ckdate': ckdate, 'ckgid': ckgid, 'ckint': ckint, 'ckitem': ckitem,
+    'ckkeywd': ckkeywd, 'ckpath': ckpath, 'ckrange': ckrange, 'ckstr': ckstr,
+    'cktime': cktime, 'ckuid': ckuid, 'ckyorn': ckyorn,
+}
+
+
+def coprocess(requests=None, responses=None, terminal=None):
+    """Serve prompt requests from a shell script, one per line.
+
+    Each request is a line of JSON with the prompt ``type`` (e.g. "ckint")
+    and the keyword arguments for the prompt, for example
+    ``{"type": "ckrange", "prompt": "Size", "lower": 1, "upper": 64}``.
+    The operator answers on the terminal, by default /dev/tty.
+
+    Each response is one line, ``status value``. The status is 0 for an
+    answer, 3 when the operator quits, and 1 for a bad request, a
+    timeout or End-of-File, in which case the value is the error message. A request
+    can give a ``timeout`` in seconds.
+
+    Requests are read from stdin and responses written to stdout,
+    unless other files (e.g., FIFOs) are given. Without a terminal,
+    each request gets status 1.
+    """
+    import json
+    requests = requests if requests is not None else sys.stdin
+    responses = responses if responses is not None else sys.stdout
+    with contextlib.ExitStack() as stack:
+        unavailable = None
+        if terminal is None:
+            try:
+                terminal = (stack.enter_context(open("/dev/tty")),
+                    stack.enter_context(open("/dev/tty", "w")))
+            except OSError as ex:
+                unavailable = "OSError: no terminal: {}".format(ex.strerror)
+        for line in requests:
+            if not line.strip():
+                continue
+            if unavailable is not None:
+                responses.write("1 {}\n".format(unavailable))
+                responses.flush()
+                continue
+            source, target = terminal
+            try:
+                options = json.loads(line)
+                ck = PROMPTS[options.pop('type')]
+                dialog_options = {
+                    name: options.pop(name) for name in ['prompt', 'default', 'help', 'error']
+                    if name in options}
+                timeout = options.pop('timeout', None)
+                configured = ck.configure(**options)
+                status, value = 0, converse(
+                    configured.dialog(**dialog_options), TextStreams(source, target),
+                    configured.deadline(timeout))
+            except Timeout:
+                status, value = 1, "Timeout: no answer in time"
+            except EndOfInput:
+                status, value = 1, "EndOfInput: end of input on the terminal"
+            except UserQuit:
+                status, value = 3, ""
+            except (ValueError, TypeError, KeyError, AttributeError) as ex:
+                status, value = 1, "{}: {}".format(type(ex).__name__, ex)
+            responses.write("{} {}\n".format(status, value))
+            responses.flush()
+
+
+Field = namedtuple('Field', ['name', 'spec', 'prompt', 'default'])
+Report = namedtuple('Report', ['source', 'values', 'errors'])
+
+
+class Form:
+    """A sequence of named prompts, declared once.
+
+    ::
+
+        host = Form()
+        host.add("start", ckdate, format="%Y-%m-%d")
+        host.add("size", ckrange, lower=1, upper=64, default=8)
+
+    A form can ask its questions with ``ask()``, or check answer files
+    of ``name=value`` lines with ``check()`` and ``bulk()``.
+    """
+    def __init__(self):
+        self.fields = {}
+
+    def add(self, name, ck, *, prompt=None, default=None, **options):
+        """Add a field, set up with the options. Returns the form."""
+        if name in self.fields:
+            raise ValueError("duplicate field {!r}".format(name))
+        self.fields[name] = Field(name, ck.configure(**options), prompt, default)
+        return self
+
+    def ask(self, io=None):
+        """Ask each question in turn, with an I/O backend.
+        Returns a dictionary of the answers.
+        Raises UserQuit when the user quits.
+        """
+        return {
+            field.name: field.spec(
+                prompt=field.prompt if field.prompt is not None else field.name,
+                default=field.default, io=io)
+            for field in self.fields.values()}
+
+    def check(self, lines, source=None):
+        """Validate the ``name=value`` lines of an answer file.
+
+        Blank lines and lines starting with "#" are ignored. An empty value,
+        or a missing line, takes the default of the field.
+
+        Returns a Report with the source, a dictionary of the valid values,
+        and a list of the errors, one line each, as ``source:line: message``.
+        """
+        values = {}
+        errors = []
+        seen = set()
+
+        def fail(line, message):
+            errors.append("{}:{}: {}".format(source, line, " ".join(message.split())))
+
+        for line, text in enumerate(lines, 1):
+            text = text.rstrip('\r\n')
+            if not text.strip() or text.lstrip().startswith('#'):
+                continue
+            name, equals, text = text.partition('=')
+            name = name.strip()
+            if not equals:
+                fail(line, "expected name=value")
+            elif name not in self.fields:
+                fail(line, "{}: unknown field".format(name))
+            elif name in seen:
+                fail(line, "{}: duplicate answer".format(name))
+            else:
+                seen.add(name)
+                field = self.fields[name]
+                if text == '' and field.default is not None:
+                    values[name] = field.default
+                    continue
+                try:
+                    values[name] = field.spec.validate(text)
+                except Invalid as ex:
+                    fail(line, "{}: {}".format(name, field.spec.explain(text, ex)))
+        for field in self.fields.values():
+            if field.name in seen:
+                continue
+            elif field.default is not None:
+                values[field.name] = field.default
+            else:
+                fail(0, "{}: missing answer".format(field.name))
+        return Report(source, values, errors)
+
+    def bulk(self, filenames, *, report=None, processes=None, chunksize=8):
+        """Check many answer files, spread over a pool of processes.
+
+        Each worker gets the form once, with its compiled formats, menu
+        indexes and user and group names, so nothing is rebuilt per file.
+        The errors for all of the files are written to ``report``, a file,
+        in the order of the filenames.
+
+        Lazily yields a Report for each file.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes, initializer=share_form, initargs=(self,)) as pool:
+            for result in pool.map(check_file, filenames, chunksize=chunksize):
+                if report is not None:
+                    report.writelines(error + "\n" for error in result.errors)
+                yield result
+
+
+# The form for the worker processes of Form.bulk()
+shared_form = None
+
+
+def share_form(form):
+    global shared_form
+    shared_form = form
+
+
+def check_file(filename):
+    try:
+        with open(filename) as lines:
+            return shared_form.check(lines, filename)
+    except OSError as ex:
+        return Report(filename, {}, ["{}:0: {}".format(filename, ex.strerror)])
+    except UnicodeDecodeError as ex:
+        return Report(filename, {}, ["{}:0: {}".format(filename, ex)])
+
+
+def read_choices(filename):
+    """Menu items from a file, the first field of each line."""
+    with open(filename) as source:
+        return [line.split()[0] for line in source if line.strip()]
+
+
+# The option letter maps to a keyword argument and a conversion.
+# Without a conversion, the option is a flag, added to a string of flags.
+# The timeout is -t, or -T for ckpath, where -t is the creatable rule.
+OPTIONS = {
+    'd': ('default', str), 'h': ('help', str), 'e': ('error', str), 'p': ('prompt', str),
+    't': ('timeout', float), 'T': ('timeout', float),
+}
+
+COMMAND_OPTIONS = {
+    'ckdate': {'f': ('format', str)},
+    'ckgid': {},
+    'ckint': {'b': ('base', int)},
+    'ckitem': {'l': ('label', str), 'i': ('invisible', lambda text: text.split(',')),
+        'f': ('choices', read_choices)},
+    'ckkeywd': {},
+    'ckpath': {letter: ('rules', None) for letter in CKPATH.RULES},
+    'ckrange': {'l': ('lower', int), 'u': ('upper', int), 'b': ('base', int)},
+    'ckstr': {'r': ('regexp', str)},
+    'cktime': {'f': ('format', str)},
+    'ckuid': {},
+    'ckyorn': {},
+}
+
+POSITIONAL = {'ckitem': 'choices', 'ckkeywd': 'keywords'}
+
+
+def main(argv=None):
+    """Command-line entry point for ckdate, ckint, ckitem, etc.
+
+    The command is the program name (for the installed scripts) or the
+    first argument, as in ``python3 -m clux ckyorn -p "Continue?"``.
+    The answer is written to stdout; prompts and messages go to stderr.
+
+    Returns the Solaris exit status: 0 for an answer, 1 for End-of-File
+    or a timeout (-t or -T seconds) without a default, 2 for a usage error,
+    3 when the user quits, and 4 for a bad format, mutually exclusive
+    rules or missing choices.
+    """
+    argv = sys.argv if argv is None else argv
+    name = os.path.splitext(os.path.basename(argv[0]))[0]
+    args = argv[1:]
+    if name not in PROMPTS:
+        if args == ['--coprocess']:
+            coprocess()
+            return 0
+        elif not args:
+            demo()
+            return 0
+        name, args = args[0], args[1:]
+    if name not in PROMPTS:
+        print("usage: {} [options] [choices]".format(" | ".join(PROMPTS)), file=sys.stderr)
+        return 2
+    import getopt
+    options = dict(OPTIONS, **COMMAND_OPTIONS[name])
+    try:
+        opts, args = getopt.getopt(args, "".join(
+            letter + (":" if conversion else "") for letter, (_, conversion) in options.items()))
+        kw = {}
+        for opt, value in opts:
+            keyword, conversion = options[opt[1:]]
+            if conversion is None:
+                kw[keyword] = kw.get(keyword, "") + opt[1:]
+            else:
+                kw[keyword] = conversion(value)
+    except (getopt.GetoptError, ValueError, OSError) as ex:
+        print("{}: {}".format(name, ex), file=sys.stderr)
+        return 2
+    if args and name in POSITIONAL:
+        kw[POSITIONAL[name]] = kw.get(POSITIONAL[name], []) + args
+    elif args:
+        print("{}: unexpected arguments {}".format(name, " ".join(args)), file=sys.stderr)
+        return 2
+    dialog_options = {
+        keyword: kw.pop(keyword) for keyword in ['prompt', 'default', 'help', 'error']
+        if keyword in kw}
+    timeout = kw.pop('timeout', None)
+    try:
+        configured = PROMPTS[name].configure(**kw)
+    except (ValueError, TypeError) as ex:
+        print("{}: {}".format(name, ex), file=sys.stderr)
+        return 4
+    try:
+        answer = converse(configured.dialog(**dialog_options),
+            TextStreams(sys.stdin, sys.stderr), configured.deadline(timeout))
+    except (EndOfInput, Timeout):
+        return 1
+    except UserQuit:
+        return 3
+    print(answer)
+    return 0
+
+
 def demo():
     v1 = int(ckint(prompt="Enter a value"))
     v2 = int(ckint(prompt="Enter another value"))
     print("{} * {} = {}".format(v1, v2, v1*v2))
     
 if __name__ == "__main__":
-    demo()
+    sys.exit(main())
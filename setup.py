@@ -22,4 +22,13 @@ setup(
     ],
 
     py_modules=["clux"],
+
+    entry_points={
+        'console_scripts': [
+            '{0}=clux:main'.format(command) for command in [
+                'ckdate', 'ckgid', 'ckint', 'ckitem', 'ckkeywd', 'ckpath',
+                'ckrange', 'ckstr', 'cktime', 'ckuid', 'ckyorn',
+            ]
+        ],
+    },
 )
@@ -2,11 +2,19 @@
 """Tests
 """
 
+import asyncio
 import clux
 import unittest
 from unittest.mock import Mock, patch, call
 import datetime
+import io
+import json
+import os
 import pathlib
+import pickle
+import subprocess
+import sys
+import tempfile
 
 class Test_CKDATE(unittest.TestCase):
     @patch('clux.print', Mock())
@@ -28,6 +36,44 @@ class Test_CKDATE(unittest.TestCase):
         ])
         clux.print.assert_called_once_with('ERROR - Please enter a date.  Format is %m/%d/%y.')
 
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['2/30/11', '30/1/11']))
+    def test_formats(self):
+        response = clux.ckdate(prompt="date", format=["%m/%d/%y", "%d/%m/%y"])
+        self.assertEqual(datetime.date(2011,1,30), response)
+        clux.print.assert_called_once_with('ERROR - Please enter a date.  Format is %m/%d/%y or %d/%m/%y.')
+
+
+class Test_DateTimeFormat(unittest.TestCase):
+    def test_matches_strptime(self):
+        examples = [
+            ("%m/%d/%y", "9/10/11"), ("%m/%d/%y", "09/10/69"), ("%Y-%m-%d", "2011-02-29"),
+            ("%d %m %Y", " 1   2 2003"), ("%H:%M:%S.%f", "23:59:60.25"), ("%Y%m%d", "20110910"),
+            ("T%H:%M", "t09:05"), ("%b %d", "Sep 10"), ("%m/%d/%y", "9/10/11 "),
+        ]
+        for format, text in examples:
+            with self.subTest(format=format, text=text):
+                try:
+                    expected = datetime.datetime.strptime(text, format)
+                except ValueError:
+                    expected = None
+                try:
+                    actual = clux.compile_formats((format,)).parse(text)
+                except ValueError:
+                    actual = None
+                self.assertEqual(expected, actual)
+
+    def test_bad_formats(self):
+        for format in ["%d/%d", "%Q", "%H:%M:%"]:
+            with self.subTest(format=format), self.assertRaises(ValueError):
+                clux.ckdate.configure(format=["%m/%d/%y", format])
+        with self.assertRaises(ValueError):
+            clux.cktime.configure(format="%Q")
+
+    def test_shared(self):
+        self.assertIs(clux.compile_formats(("%H:%M",)), clux.compile_formats(("%H:%M",)))
+        self.assertIsNone(clux.compile_formats(("%b %d",)).pattern)
+
 class Test_CKGID(unittest.TestCase):
     @patch('clux.print', Mock())
     @patch('clux.input', Mock(side_effect=['wheel']))
@@ -40,6 +86,121 @@ class Test_CKGID(unittest.TestCase):
         clux.print.assert_not_called()
         clux.pathlib.Path.assert_called_once_with('/etc/group')
 
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['nobody', '??', 'g3']))
+    @patch('clux.CKGID.LIMIT', 2)
+    def test_summarized_groups(self):
+        groups = clux.NameSet(["g1", "g2", "g3"])
+        with patch.object(clux.CKGID, 'get_groups', Mock(return_value=groups)):
+            response = clux.ckgid(prompt="group")
+        self.assertEqual("g3", response)
+        clux.print.assert_has_calls([
+            call('ERROR - Please enter one of the following group names: g1,g2,... (first 2 of 3, type ?? for more)'),
+            call('Please enter one of the following group names: g1,g2,g3'),
+        ])
+
+
+class Test_Directory(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tempdir.name) / "group"
+        self.path.write_text('# comment\nwheel:*:0:root\n_hidden:*:1:\nStaff:*:20:\n')
+        self.directory = clux.Directory(str(self.path))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_cached(self):
+        names = self.directory.get(clux.CKGID.exclude)
+        self.assertEqual(clux.NameSet(["wheel", "staff"]), names)
+        self.assertEqual("wheel,staff", str(names))
+        self.assertIs(names, self.directory.get(clux.CKGID.exclude))
+
+    def test_reload(self):
+        before = self.directory.get()
+        self.path.write_text('wheel:*:0:root\nadmin:*:80:\nother:*:81:\n')
+        os.utime(self.path, ns=(0, 0))
+        after = self.directory.get()
+        self.assertIn("_hidden", before)
+        self.assertEqual(("wheel", "admin", "other"), after.order)
+
+    def test_nss(self):
+        directory = clux.Directory(str(self.path), nss='grp')
+        with patch.object(directory, 'enumerate', Mock(return_value=['ldapgroup', 'wheel'])):
+            names = directory.get(nss=True)
+        self.assertIn("ldapgroup", names)
+        self.assertEqual(4, len(names))
+
+
+class Test_MappedNames(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tempdir.name) / "group"
+        self.path.write_text('# comment\nwheel:*:0:root\n_hidden:*:1:\nStaff:*:20:\nstaff2:*:21:\n')
+        self.index = os.path.join(self.tempdir.name, "group.idx")
+        self.directory = clux.Directory(str(self.path), index=self.index)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_lookup(self):
+        names = self.directory.get(clux.CKGID.exclude)
+        self.assertIsInstance(names, clux.MappedNames)
+        self.assertIn("staff", names)
+        self.assertNotIn("_hidden", names)
+        self.assertNotIn("nobody", names)
+        self.assertEqual(("wheel", "staff", "staff2"), names.order)
+        self.assertEqual(["staff", "staff2"], list(names.prefixed("st")))
+        self.assertIs(names, self.directory.get(clux.CKGID.exclude))
+
+    def test_shared(self):
+        self.directory.get()
+        shared = clux.Directory(str(self.path), index=self.index)
+        with patch.object(shared, 'load') as load:
+            self.assertIn("wheel", shared.get())
+        load.assert_not_called()
+        self.assertIn("_hidden", pickle.loads(pickle.dumps(shared.get())))
+
+    def test_rebuild(self):
+        self.assertNotIn("admin", self.directory.get())
+        self.path.write_text('wheel:*:0:root\nadmin:*:80:\n')
+        os.utime(self.path, ns=(0, 0))
+        self.assertIn("admin", clux.Directory(str(self.path), index=self.index).get())
+        self.assertEqual("wheel,admin", str(self.directory.get()))
+
+    def test_corrupt(self):
+        for data in [b"", b"CLUXNAM1xx", self.header(10**6)]:
+            with self.subTest(data=data):
+                with open(self.index, "wb") as index:
+                    index.write(data)
+                directory = clux.Directory(str(self.path), index=self.index)
+                self.assertIn("wheel", directory.get())
+                self.assertIsInstance(directory.get(), clux.MappedNames)
+
+    def test_untrusted(self):
+        clux.MappedNames.write(self.index, clux.Directory.stat(self.path), ["wheel", "intruder"])
+        os.chmod(self.index, 0o666)
+        with self.assertRaises(ValueError):
+            clux.MappedNames(self.index)
+        self.assertNotIn("intruder", self.directory.get())
+        self.assertEqual(0o644, os.stat(self.index).st_mode & 0o777)
+        self.assertEqual(["group.idx"], [n for n in os.listdir(self.tempdir.name) if n.startswith("group.")])
+
+    def header(self, count):
+        import struct
+        stamp = clux.Directory.stat(self.path)
+        return struct.pack(clux.MappedNames.HEADER, clux.MappedNames.MAGIC, *stamp, count)
+
+    def test_prompt(self):
+        class IndexedGID(clux.CKGID):
+            DIRECTORY = self.directory
+        ck = IndexedGID().configure()
+        self.assertEqual("staff", ck.validate("Staff"))
+        self.assertEqual("?,q", ck.hint())
+        self.assertNotIn("names", vars(self.directory.get(clux.CKGID.exclude)))
+        self.assertEqual(
+            "ERROR - Please enter one of the following group names: wheel,staff,staff2", ck.error())
+
 
 class Test_CKINT(unittest.TestCase):
     @patch('clux.print', Mock())
@@ -50,6 +211,28 @@ class Test_CKINT(unittest.TestCase):
         clux.input.assert_called_once_with('int [?,q]: ')
         clux.print.assert_not_called()
 
+    def test_bases(self):
+        ck = clux.ckint.configure(base=16, prefixes=True, suffixes=True)
+        self.assertEqual(255, ck.validate("ff"))
+        self.assertEqual(-5, ck.validate(" -0b1_01 "))
+        self.assertEqual(0o17, ck.validate("0o17"))
+        self.assertEqual(2 * 2**20, ck.validate("2M"))
+        for text in ["fz", "1__0", "_1", "0x", "1K2"]:
+            with self.subTest(text=text), self.assertRaises(clux.Invalid):
+                ck.validate(text)
+        self.assertEqual("ERROR - Please enter a base 16 integer.", ck.error())
+        self.assertIs(ck.parser, clux.ckint.configure(base=16, prefixes=True, suffixes=True).parser)
+        with self.assertRaises(ValueError):
+            clux.ckint.configure(base=37)
+        for options in [dict(prefixes=True), dict(base=36), dict(base=10, suffixes=True)]:
+            with self.subTest(**options), self.assertRaises(clux.Invalid):
+                clux.ckint.configure(**options).validate("9" * 5000)
+        self.assertEqual([None], clux.ckrange.configure(base=36).parser.parse_many(["9" * 5000]))
+
+    def test_bugs_not_hidden(self):
+        with self.assertRaises(TypeError):
+            clux.ckrange.configure(lower=None).validate("1")
+
 
 class Test_CKITEM(unittest.TestCase):
     @patch('clux.print', Mock())
@@ -58,11 +241,7 @@ class Test_CKITEM(unittest.TestCase):
         response = clux.ckitem(prompt="menu", label="items", choices=["this", "that"])
         self.assertEqual("this", response)
         clux.input.assert_called_once_with('menu [?,??,q]: ')
-        clux.print.assert_has_calls([
-            call('items'),
-            call("1: this"),
-            call("2: that")
-        ])
+        clux.print.assert_called_once_with('items\n1: this\n2: that')
         
     @patch('clux.print', Mock())
     @patch('clux.input', Mock(side_effect=['that']))
@@ -70,13 +249,203 @@ class Test_CKITEM(unittest.TestCase):
         response = clux.ckitem(prompt="menu", label="items", choices=["this", "that"])
         self.assertEqual("that", response)
         clux.input.assert_called_once_with('menu [?,??,q]: ')
+        clux.print.assert_called_once_with('items\n1: this\n2: that')
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['th', 'thi']))
+    def test_prebuilt_index(self):
+        index = clux.PrefixIndex(["this", "that"], invisible=["other"])
+        response = clux.ckitem(prompt="menu", choices=index)
+        self.assertEqual("this", response)
+        self.assertEqual(2, clux.input.call_count)
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['>', '>', '<', '??', '7']))
+    def test_paged_menu(self):
+        choices = ["item{}".format(n) for n in range(1, 8)]
+        response = clux.ckitem(prompt="menu", choices=choices, page_size=3, columns=2)
+        self.assertEqual("item7", response)
+        clux.input.assert_called_with('menu [?,??,<,>,q]: ')
+        self.assertEqual(5, clux.print.call_count)
+        clux.print.assert_has_calls([
+            call('1: item1  3: item3\n2: item2\nPage 1 of 3. Enter < or > for the previous or next page.'),
+            call('4: item4  6: item6\n5: item5\nPage 2 of 3. Enter < or > for the previous or next page.'),
+            call('7: item7\nPage 3 of 3. Enter < or > for the previous or next page.'),
+            call('4: item4  6: item6\n5: item5\nPage 2 of 3. Enter < or > for the previous or next page.'),
+            call('4: item4  6: item6\n5: item5\nPage 2 of 3. Enter < or > for the previous or next page.'),
+        ])
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['9', 'bananna', 'b']))
+    def test_suggestions(self):
+        response = clux.ckitem(prompt="menu", choices=["apple", "apricot", "banana"])
+        self.assertEqual("banana", response)
         clux.print.assert_has_calls([
-            call('items'),
-            call("1: this"),
-            call("2: that")
+            call('1: apple\n2: apricot\n3: banana'),
+            call(clux.CKITEM.NUM_ERROR),
+            call(clux.CKITEM.TXT_ERROR.rstrip() + '\nDid you mean banana?'),
         ])
 
 
+class Inventory:
+    """A choice source, with a SQLite table of hosts."""
+    def __init__(self, size):
+        import sqlite3
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE host (id INTEGER PRIMARY KEY, name TEXT, hidden INTEGER)")
+        self.db.execute("CREATE INDEX host_name ON host (name)")
+        self.db.executemany("INSERT INTO host (name, hidden) VALUES (?, ?)",
+            (("host{:06d}".format(n), 0) for n in range(size)))
+        self.db.execute("INSERT INTO host (name, hidden) VALUES ('spare', 1)")
+        self.queries = Mock()
+
+    def count(self):
+        self.queries('count')
+        return self.db.execute("SELECT count(*) FROM host WHERE NOT hidden").fetchone()[0]
+
+    def slice(self, start, stop):
+        self.queries('slice', start, stop)
+        rows = self.db.execute(
+            "SELECT name FROM host WHERE NOT hidden ORDER BY id LIMIT ? OFFSET ?", (stop-start, start))
+        return [name for name, in rows]
+
+    def prefix(self, prefix, limit):
+        self.queries('prefix', prefix, limit)
+        rows = self.db.execute(
+            "SELECT name FROM host WHERE name >= ? AND substr(name, 1, ?) = ? ORDER BY name LIMIT ?",
+            (prefix, len(prefix), prefix, limit))
+        return [name for name, in rows]
+
+
+class Test_PagedChoices(unittest.TestCase):
+    def setUp(self):
+        self.inventory = Inventory(20000)
+        self.ck = clux.ckitem.configure(choices=self.inventory)
+
+    def test_menu(self):
+        menu = self.ck.render_menu(3)
+        self.assertTrue(menu.startswith("301: host000300\n"))
+        self.assertIn("Page 4 of 200.", menu)
+        self.assertEqual(
+            [call('count'), call('slice', 300, 400)], self.inventory.queries.mock_calls)
+
+    def test_validate(self):
+        self.assertEqual("host005432", self.ck.validate("5433"))
+        self.assertEqual("host005432", self.ck.validate("host005432"))
+        self.assertEqual("spare", self.ck.validate("sp"))
+        with self.assertRaises(clux.Invalid):
+            self.ck.validate("host00543")
+        self.assertEqual(["host005430", "host005431"], list(self.ck.candidates("host00543"))[:2])
+        self.assertIn("host005432", self.ck.explain("host005432x", clux.Invalid(clux.InputType.TEXT)))
+
+    def test_cache(self):
+        choices = clux.PagedChoices(self.inventory)
+        for n in [1, 2, 101, 1, 201, 301]:
+            choices.select(n)
+        self.assertEqual(4, len([c for c in self.inventory.queries.mock_calls if c.args[0] == 'slice']))
+        with patch.object(clux.PagedChoices, 'PAGES', 2):
+            for n in [1, 5001, 10001, 1]:
+                choices.select(n)
+        self.assertEqual([100, 0], list(choices.cache))
+
+    def test_not_live(self):
+        with self.assertRaises(TypeError):
+            clux.ckitem.live(choices=clux.PagedChoices(self.inventory))
+
+
+class Test_LiveFilter(unittest.TestCase):
+    def setUp(self):
+        items = ["item{:05d}".format(n) for n in range(20000)]
+        self.chooser = clux.LiveFilter(clux.ckitem.configure(choices=items), rows=3)
+
+    def test_narrowing(self):
+        for key in "item0012":
+            self.chooser.key(key)
+        self.assertEqual(10, len(self.chooser))
+        self.chooser.key("9")
+        self.assertEqual(["> item00129"], self.chooser.render("x")[2:])
+        self.chooser.key("\x7f")
+        self.assertEqual(10, len(self.chooser))
+
+    def test_choice(self):
+        for key in self.chooser.split("item001\x1b[B\x1b[B\x1b[B\x1b[B"):
+            self.chooser.key(key)
+        self.assertEqual(["  item00103", "> item00104"], self.chooser.render("x")[-2:])
+        self.assertEqual("item00104", self.chooser.key("\r"))
+
+    def test_number(self):
+        self.chooser.type("42")
+        self.assertEqual(0, len(self.chooser))
+        self.assertEqual("item00041", self.chooser.key("\n"))
+        with self.assertRaises(clux.UserQuit):
+            self.chooser.key("\x1b")
+
+    def test_invisible(self):
+        chooser = clux.LiveFilter(clux.ckitem.configure(choices=["this", "that"], invisible=["thistle"]))
+        chooser.type("thi")
+        self.assertEqual(["> this"], chooser.render("x")[2:])
+        chooser.type("st")
+        self.assertEqual(0, len(chooser))
+        self.assertEqual("thistle", chooser.choice())
+
+    def test_terminal(self):
+        import pty
+        primary, secondary = pty.openpty()
+        with open(secondary) as terminal, patch('sys.stdin', terminal), patch('sys.stdout', io.StringIO()):
+            os.write(primary, b"th\x1b[B\r")
+            self.assertEqual("this", clux.ckitem.live(choices=["this", "that", "other"]))
+        os.close(primary)
+
+
+class Test_PrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = clux.PrefixIndex(["this", "that", "thistle", "other"], invisible=["hidden"])
+
+    def test_select(self):
+        self.assertEqual("that", self.index.select(2))
+        self.assertEqual("hidden", self.index.select(5))
+        with self.assertRaises(clux.Invalid) as ctx:
+            self.index.select(6)
+        self.assertEqual(clux.InputType.NUMERIC, ctx.exception.args[0])
+
+    def test_prefix(self):
+        self.assertEqual(["that", "this", "thistle"], self.index.matches("th"))
+        self.assertEqual("thistle", self.index.unique("thist"))
+        self.assertEqual("hidden", self.index.unique("h"))
+        with self.assertRaises(clux.Invalid) as ctx:
+            self.index.unique("this")
+        self.assertEqual(clux.InputType.TEXT, ctx.exception.args[0])
+        self.assertEqual([], self.index.matches("z"))
+
+    def test_suggest(self):
+        self.assertEqual(["thistle"], self.index.suggest("thistel", 1))
+        self.assertEqual(["that", "this"], self.index.suggest("th", 2))
+        self.assertEqual([], self.index.suggest("xyzzy"))
+
+    def test_suggest_bounded(self):
+        index = clux.PrefixIndex("item{:06d}".format(n) for n in range(100000))
+        index.POSTINGS = 1000
+        index.ngrams()
+        self.assertEqual([], index.suggest("itme"))
+        self.assertEqual(["item012345"], index.suggest("itm012345", 1))
+
+    def test_suggest_nearby(self):
+        with patch.object(clux.threading, 'Thread'):
+            index = clux.PrefixIndex("host{:06d}".format(n) for n in range(clux.PrefixIndex.BACKGROUND))
+        self.assertIsNone(index.ngrams(wait=False))
+        self.assertEqual(["host000123"], index.suggest("host000123x", 1))
+        self.assertNotIn("grams", vars(index))
+        copy = pickle.loads(pickle.dumps(index))
+        copy.ngrams()
+        self.assertEqual(["host000123"], copy.suggest("hots000123", 1))
+
+    def test_live_list(self):
+        choices = ["alpha", "beta"]
+        self.assertEqual("beta", clux.ckitem.configure(choices=choices).validate("2"))
+        choices[1] = "gamma"
+        self.assertEqual("gamma", clux.ckitem.configure(choices=choices).validate("2"))
+
+
 class Test_CKKEYWD(unittest.TestCase):
     @patch('clux.print', Mock())
     @patch('clux.input', Mock(side_effect=['that']))
@@ -86,6 +455,18 @@ class Test_CKKEYWD(unittest.TestCase):
         clux.input.assert_called_once_with('kw [this,that,?,q]: ')
         clux.print.assert_not_called()
 
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['thiss', 'this']))
+    def test_suggestions(self):
+        clux.ckkeywd(prompt="kw", keywords=["this", "that"])
+        clux.print.assert_called_once_with(
+            'ERROR: Please enter one of the following keywords: this,that,q\nDid you mean this, that?')
+
+    def test_cached_templates(self):
+        prompt = clux.ckkeywd.configure(keywords=["this", "that"])
+        self.assertIs(prompt.error(), prompt.error())
+        self.assertEqual('ERROR: Please enter one of the following keywords: this,that,q', prompt.error())
+
 
 class Test_CKPATH(unittest.TestCase):
     @patch('clux.print', Mock())
@@ -97,6 +478,60 @@ class Test_CKPATH(unittest.TestCase):
         clux.print.assert_not_called()
 
 
+class Test_CKPATH_Rules(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.dir = pathlib.Path(self.tempdir.name)
+        (self.dir / "empty").write_text("")
+        (self.dir / "data").write_text("data")
+        self.addCleanup(clux.CKPATH.FILES.invalidate)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def valid(self, rules, name):
+        try:
+            clux.ckpath.configure(rules=rules).validate(str(self.dir / name))
+            return True
+        except clux.Invalid:
+            return False
+
+    def test_rules(self):
+        self.assertTrue(self.valid("aofzr", "data"))
+        self.assertFalse(self.valid("aofz", "empty"))
+        self.assertFalse(self.valid("oy", "data"))
+        self.assertTrue(self.valid("oy", ""))
+        self.assertFalse(self.valid("o", "missing"))
+        self.assertTrue(self.valid("nt", "missing"))
+        self.assertFalse(self.valid("n", "data"))
+        self.assertFalse(self.valid("t", "nodir/missing"))
+        self.assertFalse(self.valid("l", "data"))
+        for rules in ["ay", "af", "ab", "ac", "az"]:
+            with self.subTest(rules=rules):
+                self.assertFalse(self.valid(rules, "missing"))
+        with self.assertRaises(ValueError):
+            clux.ckpath.configure(rules="aq")
+        for rules in ["no", "al", "by", "bf", "cy"]:
+            with self.subTest(rules=rules), self.assertRaises(ValueError):
+                clux.ckpath.configure(rules=rules)
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['relative', '/']))
+    def test_message(self):
+        self.assertEqual(pathlib.Path("/"), clux.ckpath(prompt="path", rules="ay"))
+        clux.print.assert_called_once_with(
+            'ERROR: Invalid pathname. The pathname must begin with a slash (/) and must be a directory.')
+
+    def test_single_stat(self):
+        prompt = clux.ckpath.configure(rules="ofzrw")
+        with patch('clux.os.stat', Mock(wraps=os.stat)) as stat, \
+                patch('clux.os.access', Mock(wraps=os.access)) as access:
+            for _ in range(3):
+                prompt.validate(str(self.dir / "data"))
+        stat.assert_called_once_with(str(self.dir / "data"))
+        access.assert_called_once_with(str(self.dir / "data"), os.R_OK | os.W_OK)
+
+
 class Test_CKRANGE(unittest.TestCase):
     @patch('clux.print', Mock())
     @patch('clux.input', Mock(side_effect=['4']))
@@ -114,6 +549,16 @@ class Test_CKRANGE(unittest.TestCase):
         clux.input.assert_has_calls([call('int [?,q]: '), call('int [?,q]: ')])
         clux.print.assert_has_calls([call('ERROR - Please enter an integer between 1 and 10.')])
 
+    def test_column(self):
+        ck = clux.ckrange.configure(lower=0, upper=4096, prefixes=True, suffixes=True)
+        column = ck.column(["1k", "5K", "0x10", "-1", "x", "4_096"])
+        self.assertEqual([1024, None, 16, None, None, 4096], column.values)
+        self.assertEqual(
+            "ERROR - Please enter an integer between 0 and 4096.", ck.error())
+        self.assertEqual(
+            "Please enter a base 8 integer between 0 and 4096.",
+            clux.ckrange.configure(lower=0, upper=4096, base=8).help())
+
 
 class Test_CKSTR(unittest.TestCase):
     @patch('clux.print', Mock())
@@ -167,6 +612,520 @@ class Test_CKYORN(unittest.TestCase):
             call('prompt [y,n,?,q]: '),
         ])
         clux.print.assert_called_once_with('ERROR - Please enter yes or no.')
+
+
+class Test_Stream(unittest.TestCase):
+    def test_range_stream(self):
+        answers = iter(["4\n", "42\n", "\n", "x"])
+        responses = clux.ckrange.stream(answers, lower=1, upper=10, default=7)
+        self.assertEqual(clux.Response(1, "4", 4, None), next(responses))
+        self.assertEqual(clux.Response(2, "42", None, 'ERROR - Please enter an integer between 1 and 10.'), next(responses))
+        self.assertEqual(["\n", "x"], list(answers))
+
+    def test_item_stream(self):
+        responses = list(clux.ckitem.stream(["1", "th", "that", "9"], choices=["this", "that"]))
+        self.assertEqual(["this", None, "that", None], [r.value for r in responses])
+        self.assertEqual([None, "ERROR", None, "ERROR"], [r.error and r.error.split()[0].rstrip(":") for r in responses])
+
+    def test_stream_file(self):
+        with tempfile.TemporaryFile("w+") as answers:
+            answers.write("9/10/11\nbad\n")
+            answers.seek(0)
+            responses = list(clux.ckdate.stream(answers))
+        self.assertEqual(datetime.date(2011, 9, 10), responses[0].value)
+        self.assertEqual('ERROR - Please enter a date.  Format is %m/%d/%y.', responses[1].error)
+
+
+
+class StreamWriter:
+    """Collects the bytes written by an async prompt."""
+    def __init__(self):
+        self.output = bytearray()
+
+    def write(self, data):
+        self.output.extend(data)
+
+    async def drain(self):
+        pass
+
+
+def stream_reader(*lines):
+    reader = asyncio.StreamReader()
+    reader.feed_data("".join(line + "\n" for line in lines).encode())
+    reader.feed_eof()
+    return reader
+
+
+class Test_Async(unittest.TestCase):
+    def test_retry(self):
+        writer = StreamWriter()
+        async def prompt():
+            return await clux.ckrange.ask_async(
+                reader=stream_reader("?", "42", "0"), writer=writer, prompt="int", lower=0, upper=10)
+        response = asyncio.run(prompt())
+        self.assertEqual(0, response)
+        self.assertEqual(
+            'int [?,q]: Please enter an integer between 0 and 10.\n'
+            'int [?,q]: ERROR - Please enter an integer between 0 and 10.\n'
+            'int [?,q]: ',
+            writer.output.decode())
+
+    def test_default_and_quit(self):
+        async def prompts():
+            return await asyncio.gather(
+                clux.ckyorn.ask_async(reader=stream_reader(""), writer=StreamWriter(), default="no"),
+                clux.ckyorn.ask_async(reader=stream_reader("q"), writer=StreamWriter()),
+                clux.ckyorn.ask_async(reader=stream_reader(), writer=StreamWriter()),
+                return_exceptions=True)
+        default, quit, eof = asyncio.run(prompts())
+        self.assertEqual("no", default)
+        self.assertIsInstance(quit, clux.UserQuit)
+        self.assertIsInstance(eof, clux.UserQuit)
+
+    def test_concurrent(self):
+        async def prompts():
+            readers = [stream_reader(str(n)) for n in range(1000)]
+            return await asyncio.gather(*(
+                clux.ckrange.ask_async(reader=r, writer=StreamWriter(), lower=n, upper=n)
+                for n, r in enumerate(readers)))
+        self.assertEqual(list(range(1000)), asyncio.run(prompts()))
+
+
+
+class Test_Server(unittest.TestCase):
+    async def flow(self, session):
+        size = await session.ask(clux.ckrange, prompt="size", lower=1, upper=10)
+        color = await session.ask(clux.ckkeywd, prompt="color", keywords=["red", "green"])
+        await session.print("{} {}".format(size, color))
+
+    def test_sessions(self):
+        async def run():
+            server = await clux.serve(self.flow, host="127.0.0.1", port=0, limit=5)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await asyncio.gather(*(
+                    clux.client([str(n % 10 + 1), "0", "gr"], host="127.0.0.1", port=port)
+                    for n in range(50)))
+        transcripts = asyncio.run(run())
+        self.assertEqual(
+            'size [?,q]: color [red,green,?,q]: '
+            'ERROR: Please enter one of the following keywords: red,green,q\n'
+            'color [red,green,?,q]: 1 green\n',
+            transcripts[0])
+        self.assertTrue(transcripts[49].endswith("10 green\n"))
+
+    def test_quit(self):
+        async def run():
+            with tempfile.TemporaryDirectory() as tempdir:
+                path = os.path.join(tempdir, "clux.sock")
+                server = await clux.serve(self.flow, path=path)
+                async with server:
+                    return await clux.client(["q"], path=path)
+        self.assertEqual('size [?,q]: ', asyncio.run(run()))
+
+
+
+class Test_Metrics(unittest.TestCase):
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['?', '2/30/11', '1/2/03', 'q']))
+    def test_aggregator(self):
+        sink = clux.Aggregator()
+        records = []
+        with patch.object(clux.CKUI, 'METRICS', Mock(side_effect=lambda m: (sink(m), records.append(m)))):
+            clux.ckdate(prompt="date")
+            with self.assertRaises(clux.UserQuit):
+                clux.ckyorn(prompt="yorn")
+        self.assertEqual(1, sink.totals['CKDATE']['invalid'])
+        self.assertEqual(1, sink.totals['CKDATE']['help'])
+        self.assertEqual(1, sink.totals['CKDATE']['answer'])
+        self.assertEqual(1, sink.totals['CKYORN']['quit'])
+        self.assertIn("ValueError", records[0].errors[0])
+        self.assertLessEqual(records[0].validate_seconds, records[0].seconds)
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['']))
+    def test_json_lines(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "metrics.jsonl")
+            with patch.object(clux.CKUI, 'METRICS', clux.JSONLines(path)):
+                clux.ckint(prompt="int", default=3)
+            with open(path) as metrics:
+                record = json.loads(metrics.readline())
+        self.assertEqual("CKINT", record["name"])
+        self.assertEqual("default", record["outcome"])
+
+
+class Test_Spec(unittest.TestCase):
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['5']))
+    def test_singleton_unchanged(self):
+        self.assertEqual(5, clux.ckrange(lower=1, upper=9))
+        self.assertNotIn('lower', vars(clux.ckrange))
+        self.assertFalse(clux.ckrange.frozen)
+
+    def test_frozen(self):
+        spec = clux.ckstr.configure(regexp=r"\d{3}")
+        with self.assertRaises(AttributeError):
+            spec.regexp = None
+        self.assertIs(spec, spec.spec())
+        self.assertEqual("123", spec.configure(regexp=r"\d+").validate("123"))
+        self.assertIn(r"\d{3}", spec.error())
+
+    def test_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        def check(n):
+            lower, upper = n, n + 10
+            spec = clux.ckrange.configure(lower=lower, upper=upper)
+            good = [r.value for r in spec.stream([str(n + 5)] * 50)]
+            bad = [r.error for r in clux.ckrange.stream([str(n - 1)], lower=lower, upper=upper)]
+            return good == [n + 5] * 50 and str(lower) in bad[0]
+        with ThreadPoolExecutor(8) as pool:
+            self.assertTrue(all(pool.map(check, range(200))))
+
+
+class Test_IO(unittest.TestCase):
+    def test_script(self):
+        script = clux.Script(["99", "?", "32"])
+        self.assertEqual(32, clux.ckrange(prompt="Size", lower=1, upper=64, io=script))
+        self.assertEqual([
+            "Size [?,q]: ", "ERROR - Please enter an integer between 1 and 64.\n",
+            "Size [?,q]: ", "Please enter an integer between 1 and 64.\n",
+            "Size [?,q]: "], script.transcript)
+
+    def test_script_eof(self):
+        with self.assertRaises(clux.EndOfInput):
+            clux.ckyorn(io=clux.Script())
+
+    def test_text_streams(self):
+        target = Mock(wraps=io.StringIO())
+        streams = clux.TextStreams(io.StringIO("bad\n7\n"), target)
+        self.assertEqual(7, clux.ckint(prompt="n", io=streams))
+        self.assertEqual(2, target.write.call_count)
+        self.assertEqual(
+            "n [?,q]: ERROR - Please enter an integer.\nn [?,q]: ", target.getvalue())
+
+    @patch('clux.input', Mock(side_effect=['x', '2']))
+    @patch('clux.print')
+    def test_terminal(self, print):
+        terminal = clux.Terminal()
+        terminal.write("first")
+        terminal.write("second")
+        self.assertEqual(2, clux.ckint(io=terminal))
+        self.assertEqual(
+            [call("first\nsecond"), call("ERROR - Please enter an integer.")], print.mock_calls)
+
+
+class Test_AnswerStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "answers.jsonl")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def run_with(self, store, ck, answers, **options):
+        with patch.object(clux.CKUI, 'ANSWERS', store):
+            return ck(io=clux.Script(answers), **options)
+
+    def test_default(self):
+        store = clux.AnswerStore(self.path)
+        self.assertEqual(12, self.run_with(store, clux.ckrange, ["99", "12"], id="size", lower=1, upper=64))
+        self.assertEqual(datetime.date(2011, 9, 10), self.run_with(store, clux.ckdate, ["9/10/11"], id="start"))
+        rerun = clux.AnswerStore(self.path)
+        self.assertEqual(12, self.run_with(rerun, clux.ckrange, [""], id="size", lower=1, upper=64))
+        self.assertEqual(7, self.run_with(rerun, clux.ckrange, [""], id="size", lower=1, upper=7, default=7))
+        self.assertEqual(3, self.run_with(rerun, clux.ckint, ["3"]))
+        with open(self.path) as log:
+            self.assertEqual(3, len(log.readlines()))
+
+    def test_date_default(self):
+        start = datetime.date(2011, 9, 10)
+        self.assertEqual(start, self.run_with(clux.AnswerStore(self.path), clux.ckdate, ["9/10/11"], id="start"))
+        self.assertEqual(start, self.run_with(clux.AnswerStore(self.path), clux.ckdate, [""], id="start"))
+        self.assertEqual(start, self.run_with(clux.AnswerStore(self.path, skip=True), clux.ckdate, [], id="start"))
+        self.assertEqual(start, self.run_with(clux.AnswerStore(self.path), clux.ckdate, [""], id="start"))
+        self.assertEqual(
+            datetime.date(2003, 1, 2),
+            self.run_with(clux.AnswerStore(self.path), clux.ckdate, [""], id="other", default=datetime.date(2003, 1, 2)))
+        with open(self.path) as log:
+            self.assertEqual(1, len(log.readlines()))
+
+    def test_skip_default(self):
+        self.assertEqual(8, self.run_with(clux.AnswerStore(self.path), clux.ckrange, [""], id="size", default=8))
+        rerun = clux.AnswerStore(self.path, skip=True)
+        self.assertEqual(8, self.run_with(rerun, clux.ckrange, [], id="size", default=8))
+
+    def test_skip(self):
+        self.run_with(clux.AnswerStore(self.path), clux.ckitem, ["2"], id="color", choices=["red", "blue"])
+        with open(self.path, "a") as log:
+            log.write('{"key": "cut sh')
+        rerun = clux.AnswerStore(self.path, skip=True)
+        self.assertEqual("blue", self.run_with(rerun, clux.ckitem, [], id="color", choices=["red", "blue"]))
+        self.assertEqual("green", self.run_with(rerun, clux.ckitem, ["2"], id="color", choices=["red", "green"]))
+        rerun.compact()
+        self.assertEqual(rerun.index, clux.AnswerStore(self.path).index)
+        self.assertEqual(["blue", "green"], list(rerun.index.values()))
+
+
+class Test_Timeout(unittest.TestCase):
+    def test_default(self):
+        self.assertEqual(8, clux.ckint(default=8, timeout=1, io=clux.Script([clux.Timeout])))
+
+    def test_no_default(self):
+        with self.assertRaises(clux.Timeout):
+            clux.ckint(timeout=1, io=clux.Script(["x", clux.Timeout]))
+
+    def test_streams(self):
+        read, write = os.pipe()
+        with open(read) as source, open(write, "w") as pipe:
+            pipe.write("3\n")
+            pipe.flush()
+            streams = clux.TextStreams(source, io.StringIO())
+            self.assertEqual(3, clux.ckint(timeout=5, io=streams))
+            with patch.object(clux.CKUI, 'DEADLINE', clux.time.monotonic() + 0.05):
+                self.assertEqual("no", clux.ckyorn(default="no", io=streams))
+                with self.assertRaises(clux.Timeout):
+                    clux.ckyorn(timeout=60, io=streams)
+            pipe.write("4\n5\n")
+            pipe.flush()
+            self.assertEqual(4, clux.ckint(io=streams))
+            self.assertEqual(5, clux.ckint(timeout=5, io=streams))
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "answers")
+            with open(path, "w") as answers:
+                answers.write("1\n2\n")
+            with open(path) as source:
+                streams = clux.TextStreams(source, io.StringIO())
+                self.assertEqual(1, clux.ckint(io=streams))
+                self.assertEqual(2, clux.ckint(timeout=5, io=streams))
+                with self.assertRaises(clux.EndOfInput):
+                    clux.ckint(timeout=5, io=streams)
+        with open(os.devnull) as source:
+            with self.assertRaises(clux.EndOfInput):
+                clux.ckint(default=7, timeout=5, io=clux.TextStreams(source, io.StringIO()))
+
+    def test_async(self):
+        async def prompt():
+            reader = asyncio.StreamReader()
+            return await clux.ckint.ask_async(
+                reader=reader, writer=StreamWriter(), default=1, timeout=0.05)
+        self.assertEqual(1, asyncio.run(prompt()))
+
+    def test_metrics(self):
+        sink = clux.Aggregator()
+        with patch.object(clux.CKUI, 'METRICS', sink):
+            clux.ckint(default=1, timeout=1, io=clux.Script([clux.Timeout]))
+        self.assertEqual(1, sink.totals['CKINT']['timeout'])
+        self.assertGreater(sink.totals['CKINT']['wait_seconds'], 0)
+
+
+class Test_Column(unittest.TestCase):
+    def check(self, spec, texts):
+        expected = []
+        for text in texts:
+            try:
+                expected.append(spec.validate(text))
+            except clux.Invalid:
+                expected.append(None)
+        column = spec.column(texts)
+        self.assertEqual(expected, column.values)
+        self.assertEqual([v is None for v in expected], column.invalid)
+
+    def test_integers(self):
+        texts = [str(n) for n in range(-5000, 5000)] + ["x", " 7 ", "1_0", "", "3.5", "9" * 5000]
+        self.check(clux.ckint.configure(), texts)
+        self.check(clux.ckrange.configure(lower=-10, upper=10), texts)
+
+    def test_dates_and_times(self):
+        self.check(clux.ckdate.configure(format=["%Y-%m-%d", "%m/%d/%y"]),
+            ["2024-02-29", "2023-02-29", "9/10/11", "9/10/11", "nope"])
+        self.check(clux.cktime.configure(), ["23:59:59", "24:00:00", "1:2:3"])
+
+    def test_yorn(self):
+        self.check(clux.ckyorn.configure(), ["y", "YES", "No", "n", "maybe", ""])
+
+    def test_strings(self):
+        self.check(clux.ckstr.configure(regexp=r"\w+$"), ["abc", "12", "a b", ""])
+
+
+class Test_Form(unittest.TestCase):
+    def setUp(self):
+        self.form = (clux.Form()
+            .add("start", clux.ckdate, format="%Y-%m-%d")
+            .add("size", clux.ckrange, lower=1, upper=64, default=8)
+            .add("color", clux.ckitem, choices=["red", "green"]))
+
+    def test_check(self):
+        report = self.form.check(["# host", "start=2024-01-02", "size=", "color=gr", "x=1"], "a")
+        self.assertEqual(
+            {"start": datetime.date(2024, 1, 2), "size": 8, "color": "green"}, report.values)
+        self.assertEqual(["a:5: x: unknown field"], report.errors)
+
+    def test_errors(self):
+        report = self.form.check(["size=99", "size=2"], "b")
+        self.assertEqual([
+            "b:1: size: ERROR - Please enter an integer between 1 and 64.",
+            "b:2: size: duplicate answer",
+            "b:0: start: missing answer",
+            "b:0: color: missing answer"], report.errors)
+
+    @patch('clux.print', Mock())
+    @patch('clux.input', Mock(side_effect=['2024-01-02', '', '1']))
+    def test_ask(self):
+        self.assertEqual(
+            {"start": datetime.date(2024, 1, 2), "size": 8, "color": "red"}, self.form.ask())
+
+    def test_bulk(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            names = []
+            for n in range(6):
+                names.append(os.path.join(tempdir, "host{}".format(n)))
+                with open(names[-1], "w") as answers:
+                    answers.write("start=2024-01-0{}\nsize={}\ncolor=red\n".format(n+1, n*20))
+            names.insert(3, os.path.join(tempdir, "binary"))
+            with open(names[3], "wb") as answers:
+                answers.write(b"size=\xff\n")
+            report = io.StringIO()
+            results = list(self.form.bulk(names, report=report, processes=2, chunksize=4))
+        self.assertEqual(names, [r.source for r in results])
+        self.assertEqual([20, 40, 60], [r.values["size"] for r in results[1:3] + results[4:5]])
+        self.assertEqual({}, results[3].values)
+        lines = report.getvalue().splitlines()
+        self.assertIn("codec can't decode", lines.pop(1))
+        self.assertEqual(
+            ["{}:2: size: ERROR - Please enter an integer between 1 and 64.".format(names[n])
+                for n in (0, 5, 6)],
+            lines)
+
+
+class Test_Coprocess(unittest.TestCase):
+    def test_requests(self):
+        requests = io.StringIO(
+            '{"type": "ckrange", "prompt": "Size", "lower": 1, "upper": 64}\n'
+            '\n'
+            '{"type": "ckdate", "format": "%Y-%m-%d"}\n'
+            '{"type": "ckyorn"}\n'
+            '{"type": "cknothing"}\n'
+            '{"type": "ckint", "lower": 1}\n'
+        )
+        responses = io.StringIO()
+        source = io.StringIO("99\n32\n2011-09-10\nq\n")
+        target = io.StringIO()
+        clux.coprocess(requests, responses, (source, target))
+        self.assertEqual(
+            ["0 32", "0 2011-09-10", "3 ", "1 KeyError: 'cknothing'"],
+            responses.getvalue().splitlines()[:4])
+        self.assertTrue(responses.getvalue().splitlines()[4].startswith("1 TypeError: "))
+        self.assertTrue(target.getvalue().startswith(
+            "Size [?,q]: ERROR - Please enter an integer between 1 and 64.\nSize [?,q]: "))
+
+    def test_end_of_input(self):
+        responses = io.StringIO()
+        clux.coprocess(io.StringIO('{"type": "ckyorn"}\n'), responses, (io.StringIO(), io.StringIO()))
+        self.assertEqual("1 EndOfInput: end of input on the terminal\n", responses.getvalue())
+
+    def test_no_terminal(self):
+        result = subprocess.run(
+            [sys.executable, clux.__file__, "--coprocess"], input='{"type": "ckyorn"}\n\n{"type": "ckint"}\n',
+            capture_output=True, text=True, start_new_session=True)
+        self.assertEqual((0, ""), (result.returncode, result.stderr))
+        responses = result.stdout.splitlines()
+        self.assertEqual(2, len(responses))
+        for response in responses:
+            self.assertTrue(response.startswith("1 OSError: no terminal: "))
+
+
+
+class Test_Main(unittest.TestCase):
+    IMPORT_BUDGET = 0.050
+
+    def run_clux(self, *args, input="", env=None):
+        return subprocess.run(
+            [sys.executable] + list(args), input=input, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(clux.__file__)), env=env)
+
+    def test_commands(self):
+        result = self.run_clux("clux.py", "ckrange", "-l", "1", "-u", "10", "-p", "size", input="42\n5\n")
+        self.assertEqual((0, "5\n"), (result.returncode, result.stdout))
+        self.assertIn("size [?,q]: ERROR", result.stderr)
+        result = self.run_clux("-m", "clux", "ckitem", "-l", "fruit", "apple", "banana", input="b\n")
+        self.assertEqual((0, "banana\n"), (result.returncode, result.stdout))
+        result = self.run_clux("clux.py", "ckint", "-b", "16", input="ff\n")
+        self.assertEqual((0, "255\n"), (result.returncode, result.stdout))
+        with open(os.devnull) as devnull:
+            result = subprocess.run([sys.executable, clux.__file__, "ckint", "-t", "5", "-d", "7"],
+                                    stdin=devnull, capture_output=True, text=True)
+        self.assertEqual((1, ""), (result.returncode, result.stdout))
+        with subprocess.Popen([sys.executable, clux.__file__, "ckpath", "-o", "-T", "0.01"],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as waiting:
+            self.assertEqual(1, waiting.wait(10))
+
+    def test_exit_status(self):
+        self.assertEqual(3, self.run_clux("clux.py", "ckyorn", input="q\n").returncode)
+        self.assertEqual(1, self.run_clux("clux.py", "ckyorn").returncode)
+        self.assertEqual(2, self.run_clux("clux.py", "ckyorn", "-z").returncode)
+        self.assertEqual(2, self.run_clux("clux.py", "cknone").returncode)
+        self.assertEqual(2, self.run_clux("clux.py", "ckyorn", "extra").returncode)
+        self.assertEqual(4, self.run_clux("clux.py", "ckitem").returncode)
+        self.assertEqual(4, self.run_clux("clux.py", "ckpath", "-n", "-o").returncode)
+        self.assertEqual(4, self.run_clux("clux.py", "ckdate", "-f", "%Q", input="1/2/03\n").returncode)
+
+    def test_lazy_imports(self):
+        result = self.run_clux("-c",
+            "import sys, clux; clux.main(['ckyorn']);"
+            "print(sorted(m for m in ['datetime', 'pathlib'] if m in sys.modules))",
+            input="y\n")
+        self.assertEqual("yes\n[]\n", result.stdout)
+
+    def test_import_budget(self):
+        env = dict(os.environ)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        with tempfile.TemporaryDirectory() as cache:
+            for _ in range(3):
+                result = self.run_clux("-X", "pycache_prefix=" + cache, "-X", "importtime", "-c", "import clux", env=env)
+        cumulative = [
+            int(line.split("|")[1]) for line in result.stderr.splitlines()
+            if line.split("|")[-1].strip() == "clux"]
+        self.assertLess(cumulative[0] / 1e6, self.IMPORT_BUDGET)
+
+
+
+class Test_Completion(unittest.TestCase):
+    def complete(self, completer, text):
+        matches = []
+        while True:
+            match = completer(text, len(matches))
+            if match is None:
+                return matches
+            matches.append(match)
+
+    def test_item(self):
+        prompt = clux.ckitem.configure(choices=["apple", "apricot", "banana"], invisible=["avocado"])
+        self.assertEqual(["apple", "apricot"], self.complete(clux.Completer(prompt), "ap"))
+        self.assertEqual(["apple", "apricot", "avocado"], self.complete(clux.Completer(prompt), "A"))
+
+    def test_limit(self):
+        index = clux.PrefixIndex("item{:06d}".format(n) for n in range(500000))
+        prompt = clux.ckkeywd.configure(keywords=index)
+        matches = self.complete(clux.Completer(prompt, limit=10), "item01")
+        self.assertEqual(["item{:06d}".format(n) for n in range(10000, 10010)], matches)
+
+    def test_users(self):
+        users = clux.NameSet(["root", "daemon", "rob"])
+        with patch.object(clux.CKUID, 'get_users', Mock(return_value=users)):
+            prompt = clux.ckuid.configure()
+        self.assertEqual(["rob", "root"], self.complete(clux.Completer(prompt), "Ro"))
+
+    def test_path(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            os.mkdir(os.path.join(tempdir, "subdir"))
+            pathlib.Path(tempdir, "subfile").write_text("")
+            prompt = clux.ckpath.configure()
+            matches = self.complete(clux.Completer(prompt), tempdir + "/su")
+        self.assertEqual([tempdir + "/subdir/", tempdir + "/subfile"], sorted(matches))
+
         
 if __name__ == "__main__":
     unittest.main()